@@ -4,7 +4,6 @@
 #This file is covered by the GNU General Public License.
 #See the file COPYING for more details.
 
-import Queue
 from ctypes import *
 from ctypes.wintypes import *
 import time
@@ -291,8 +290,7 @@ isRunning=False
 # the issue, we use this cache as a fallback when either getTopLevelObject or
 # getHWNDFromAccessibleContext fails.
 vmIDsToWindowHandles={}
-internalFunctionQueue=Queue.Queue(1000)
-internalFunctionQueue.__name__="JABHandler.internalFunctionQueue"
+internalFunctionQueue=queueHandler.FunctionQueue("JABHandler.internalFunctionQueue",maxsize=1000)
 
 def internalQueueFunction(func,*args,**kwargs):
 	internalFunctionQueue.put_nowait((func,args,kwargs))
@@ -53,6 +53,13 @@ class InvalidNVDAObject(RuntimeError):
 
 class DynamicNVDAObjectType(baseObject.ScriptableObject.__class__):
 	_dynamicClassCache={}
+	#: Caches how to turn an object into one with a given list of overlay classes.
+	#: Maps (original class, tuple of chosen classes) to (gesture map generation, new class, steps),
+	#: where steps is a tuple of (initOverlayClass function or C{None}, gesture bindings, gesture map) for each new class in the MRO.
+	#: Gesture bindings are (normalized gesture identifier, script function or C{None} to remove the binding) pairs.
+	#: The gesture map is the shared map which results from applying the bindings for this and all previous steps
+	#: to the gesture map of the original class.
+	_overlayResolutionCache={}
 
 	def __call__(self,chooseBestAPI=True,**kwargs):
 		if chooseBestAPI:
@@ -87,6 +94,51 @@ class DynamicNVDAObjectType(baseObject.ScriptableObject.__class__):
 			if "chooseNVDAObjectOverlayClasses" in plugin.__class__.__dict__:
 				plugin.chooseNVDAObjectOverlayClasses(obj, clsList)
 
+		key=(obj.__class__,tuple(clsList))
+		try:
+			generation,newCls,steps=self._overlayResolutionCache[key]
+			if generation!=baseObject.ScriptableObject._classGestureMapGeneration:
+				# A __gestures dict has changed.
+				raise KeyError
+		except KeyError:
+			newCls,steps=self._resolveOverlayClasses(obj.__class__,clsList)
+			self._overlayResolutionCache[key]=(baseObject.ScriptableObject._classGestureMapGeneration,newCls,steps)
+
+		# Mutate obj into the new class.
+		obj.__class__=newCls
+
+		# Initialise the overlay classes.
+		for initFunc,gestures,stepGestureMap in steps:
+			if initFunc:
+				initFunc(obj)
+			# Bind gestures specified on the class.
+			if not gestures:
+				continue
+			if obj._gestureMapIsShared:
+				# Nothing has bound gestures on this instance, so it can use the precomputed map.
+				obj._gestureMap=stepGestureMap
+				continue
+			gestureMap=obj._gestureMap
+			for identifier,func in gestures:
+				if func:
+					gestureMap[identifier]=func
+				else:
+					gestureMap.pop(identifier,None)
+
+		# Allow app modules to make minor tweaks to the instance.
+		if appModule and hasattr(appModule,"event_NVDAObject_init"):
+			appModule.event_NVDAObject_init(obj)
+
+		return obj
+
+	def _resolveOverlayClasses(self,oldCls,clsList):
+		"""Work out how to turn an object into one with the given overlay classes.
+		This only depends on the classes, so the result is cached in L{_overlayResolutionCache}.
+		@param oldCls: The class of the object as constructed.
+		@param clsList: The classes chosen for the object.
+		@return: The new class and the steps needed to initialise the new classes in its MRO.
+		@rtype: tuple
+		"""
 		# Determine the bases for the new class.
 		bases=[]
 		for index in xrange(len(clsList)):
@@ -106,29 +158,36 @@ class DynamicNVDAObjectType(baseObject.ScriptableObject.__class__):
 				newCls=type(name,bases,{})
 				self._dynamicClassCache[bases]=newCls
 
-		oldMro=frozenset(obj.__class__.__mro__)
-		# Mutate obj into the new class.
-		obj.__class__=newCls
-
-		# Initialise the overlay classes.
+		# Import late to avoid circular import.
+		import inputCore
+		oldMro=frozenset(oldCls.__mro__)
+		steps=[]
+		gestureMap=oldCls._getClassGestureMap()
 		for cls in reversed(newCls.__mro__):
 			if cls in oldMro:
 				# This class was part of the initially constructed object, so its constructor would have been called.
 				continue
-			initFunc=cls.__dict__.get("initOverlayClass")
-			if initFunc:
-				initFunc(obj)
-			# Bind gestures specified on the class.
-			try:
-				obj.bindGestures(getattr(cls, "_%s__gestures" % cls.__name__))
-			except AttributeError:
-				pass
-
-		# Allow app modules to make minor tweaks to the instance.
-		if appModule and hasattr(appModule,"event_NVDAObject_init"):
-			appModule.event_NVDAObject_init(obj)
-
-		return obj
+			gestures=[]
+			for identifier,scriptName in getattr(cls,"_%s__gestures"%cls.__name__,{}).iteritems():
+				if scriptName:
+					func=getattr(newCls,"script_%s"%scriptName,None)
+					if not func:
+						log.error("Error binding script %s in %r" % (scriptName,newCls))
+						continue
+				else:
+					func=None
+				gestures.append((inputCore.normalizeGestureIdentifier(identifier),func))
+			if gestures:
+				gestureMap=dict(gestureMap)
+				for identifier,func in gestures:
+					if func:
+						gestureMap[identifier]=func
+					else:
+						gestureMap.pop(identifier,None)
+				# This map is shared by all objects which use it.
+				gestureMap=baseObject._FrozenGestureMap(gestureMap)
+			steps.append((cls.__dict__.get("initOverlayClass"),tuple(gestures),gestureMap))
+		return newCls,tuple(steps)
 
 	@classmethod
 	def clearDynamicClassCache(cls):
@@ -136,6 +195,8 @@ class DynamicNVDAObjectType(baseObject.ScriptableObject.__class__):
 		This should be called when a plugin is unloaded so that any used overlay classes in the unloaded plugin can be garbage collected.
 		"""
 		cls._dynamicClassCache.clear()
+		cls._overlayResolutionCache.clear()
+		eventHandler.clearEventHandlerCache()
 
 class NVDAObject(baseObject.ScriptableObject):
 	"""NVDA's representation of a single control/widget.
@@ -168,6 +229,11 @@ class NVDAObject(baseObject.ScriptableObject):
 	#: @type: type; L{textInfos.TextInfo}
 	TextInfo=NVDAObjectTextInfo
 
+	#: Names of events for this object which must never be coalesced,
+	#: even if L{eventHandler.COALESCE_POLICY} allows it.
+	#: @type: frozenset
+	uncoalescedEvents=frozenset()
+
 	@classmethod
 	def findBestAPIClass(cls,kwargs,relation=None):
 		"""
@@ -33,6 +33,7 @@ import NVDAObjects #Catches errors before loading default appModule
 import api
 import appModules
 import watchdog
+import eventHandler
 
 #Dictionary of processID:appModule paires used to hold the currently running modules
 runningTable={}
@@ -200,6 +201,11 @@ def reloadAppModules():
 	for mod in mods:
 		del sys.modules[mod]
 	import appModules
+	eventHandler.clearEventHandlerCache()
+	# Import late to avoid circular import.
+	import inputCore
+	if inputCore.manager:
+		inputCore.manager.invalidateGlobalMapScriptsIndex()
 	initialize()
 	for entry in state:
 		pid = entry.pop("processID")
@@ -321,6 +327,11 @@ class AppModule(baseObject.ScriptableObject):
 	#: @type: bool
 	sleepMode=False
 
+	#: Names of events for objects in this application which must never be coalesced,
+	#: even if L{eventHandler.COALESCE_POLICY} allows it.
+	#: @type: frozenset
+	uncoalescedEvents=frozenset()
+
 	def __init__(self,processID,appName=None):
 		super(AppModule,self).__init__()
 		#: The ID of the process this appModule is for.
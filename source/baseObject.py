@@ -16,7 +16,7 @@ class Getter(object):
 		self.fget=fget
 
 	def __get__(self,instance,owner):
-		if not instance:
+		if instance is None:
 			return self
 		return self.fget(instance)
 
@@ -29,10 +29,27 @@ class Getter(object):
 class CachingGetter(Getter):
 
 	def __get__(self, instance, owner):
-		if not instance:
+		if instance is None:
 			return self
+		# Check the cache here rather than calling _getPropertyViaCache for every access,
+		# as this is by far the most common case.
+		if instance._propertyCacheGeneration==_cacheGeneration:
+			try:
+				return instance._propertyCache[self.fget]
+			except KeyError:
+				pass
 		return instance._getPropertyViaCache(self.fget)
 
+	def _getViaMethod(self, instance, owner):
+		"""An implementation of L{__get__} which always calls L{AutoPropertyObject._getPropertyViaCache}.
+		@see: L{AutoPropertyObject.setPropertyCacheCounting}
+		"""
+		if instance is None:
+			return self
+		return instance._getPropertyViaCache(self.fget)
+
+	_getFast=__get__
+
 class AutoPropertyType(type):
 
 	def __init__(self,name,bases,dict):
@@ -75,53 +92,127 @@ class AutoPropertyType(type):
 			else:
 				setattr(self,x,property(fget=g,fset=s,fdel=d))
 
+#: The current property cache generation.
+#: This is incremented by L{AutoPropertyObject.invalidateCaches}.
+#: Values cached in an earlier generation are stale.
+_cacheGeneration=0
+#: Weak references to the instances which have cached values in the current generation.
+_cachedInstances=[]
+
 class AutoPropertyObject(object):
 	"""A class that dynamicly supports properties, by looking up _get_* and _set_* methods at runtime.
 	_get_x will make property x with a getter (you can get its value).
 	_set_x will make a property x with a setter (you can set its value).
 	If there is a _get_x but no _set_x then setting x will override the property completely.
-	Properties can also be cached for the duration of one core pump cycle.
+	Properties can also be cached for the duration of one core pump cycle (one cache generation).
 	This is useful if the same property is likely to be fetched multiple times in one cycle. For example, several NVDAObject properties are fetched by both braille and speech.
 	Setting _cache_x to C{True} specifies that x should be cached. Setting it to C{False} specifies that it should not be cached.
 	If _cache_x is not set, L{cachePropertiesByDefault} is used.
 	"""
 	__metaclass__=AutoPropertyType
 
-	#: Tracks the instances of this class; used by L{invalidateCaches}.
-	#: @type: weakref.WeakKeyDictionary
-	__instances=weakref.WeakKeyDictionary()
 	#: Specifies whether properties are cached by default;
 	#: can be overridden for individual properties by setting _cache_propertyName.
 	#: @type: bool
 	cachePropertiesByDefault = False
+	#: The number of property cache hits and misses counted while counting is enabled;
+	#: see L{setPropertyCacheCounting}.
+	#: @type: int
+	propertyCacheHits = 0
+	propertyCacheMisses = 0
 
 	def __init__(self):
 		#: Maps properties to cached values.
 		#: @type: dict
 		self._propertyCache={}
-		self.__instances[self]=None
+		#: The cache generation in which values in L{_propertyCache} were cached.
+		#: @type: int
+		self._propertyCacheGeneration=-1
 
 	def _getPropertyViaCache(self,getterMethod=None):
 		if not getterMethod:
 			raise ValueError("getterMethod is None")
-		try:
-			val=self._propertyCache[getterMethod]
-		except KeyError:
-			val=getterMethod(self)
-			self._propertyCache[getterMethod]=val
+		if self._propertyCacheGeneration==_cacheGeneration:
+			try:
+				return self._propertyCache[getterMethod]
+			except KeyError:
+				pass
+		else:
+			# Any cached values are from an earlier generation.
+			self._propertyCache.clear()
+			self._propertyCacheGeneration=_cacheGeneration
+			# Register this instance so that its cache can be cleared when the generation ends.
+			_cachedInstances.append(weakref.ref(self))
+		val=getterMethod(self)
+		self._propertyCache[getterMethod]=val
 		return val
 
+	#: The implementation of L{_getPropertyViaCache} used when counting is disabled.
+	_getPropertyViaCacheNoCount=_getPropertyViaCache
+
+	def _getPropertyViaCacheCounting(self,getterMethod=None):
+		if self._propertyCacheGeneration==_cacheGeneration and getterMethod in self._propertyCache:
+			AutoPropertyObject.propertyCacheHits+=1
+		else:
+			AutoPropertyObject.propertyCacheMisses+=1
+		return AutoPropertyObject._getPropertyViaCacheNoCount(self,getterMethod)
+
+	@classmethod
+	def setPropertyCacheCounting(cls,enable):
+		"""Enable or disable counting of property cache hits and misses.
+		Counting is done by swapping the implementation of L{_getPropertyViaCache},
+		so there is no overhead when it is disabled.
+		While counting, L{CachingGetter} always calls it rather than checking the cache itself.
+		@type enable: bool
+		"""
+		AutoPropertyObject._getPropertyViaCache=AutoPropertyObject._getPropertyViaCacheCounting if enable else AutoPropertyObject._getPropertyViaCacheNoCount
+		CachingGetter.__get__=CachingGetter._getViaMethod.__func__ if enable else CachingGetter._getFast.__func__
+
+	def _copyPropertyCache(self,other):
+		"""Copy the values another instance has cached in the current cache generation into the cache of this instance.
+		This instance is registered in the same way as L{_getPropertyViaCache} registers it,
+		so the copied values are cleared when the generation ends.
+		@type other: L{AutoPropertyObject}
+		"""
+		if other._propertyCacheGeneration!=_cacheGeneration or not other._propertyCache:
+			return
+		if self._propertyCacheGeneration!=_cacheGeneration:
+			self._propertyCache.clear()
+			self._propertyCacheGeneration=_cacheGeneration
+			_cachedInstances.append(weakref.ref(self))
+		self._propertyCache.update(other._propertyCache)
+
 	def invalidateCache(self):
 		self._propertyCache.clear()
 
 	@classmethod
 	def invalidateCaches(cls):
 		"""Invalidate the caches for all current instances.
+		This starts a new cache generation, so it doesn't need to visit every live instance.
+		Only instances which cached values in the generation just ended are cleared,
+		so that the references held by their caches are released promptly.
 		"""
-		# We use keys() here instead of iterkeys(), as invalidating the cache on an object may cause instances to disappear,
-		# which would in turn cause an exception due to the dictionary changing size during iteration.
-		for instance in cls.__instances.keys():
-			instance.invalidateCache()
+		global _cacheGeneration, _cachedInstances
+		_cacheGeneration+=1
+		# Swap the list first, as invalidating a cache may cause instances to disappear
+		# or cache new values.
+		instances=_cachedInstances
+		_cachedInstances=[]
+		for ref in instances:
+			instance=ref()
+			if instance is not None:
+				instance.invalidateCache()
+
+class _FrozenGestureMap(dict):
+	"""A gesture map which is shared between instances and therefore can't be modified.
+	Copy it with C{dict(gestureMap)} to get a map which can be modified.
+	@see: L{ScriptableObject._getClassGestureMap}
+	"""
+
+	def _readOnly(self, *args, **kwargs):
+		raise TypeError("Shared gesture maps can't be modified")
+
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readOnly
 
 class ScriptableObject(AutoPropertyObject):
 	"""A class that implements NVDA's scripting interface.
@@ -138,18 +229,74 @@ class ScriptableObject(AutoPropertyObject):
 	@type scriptCategory: basestring
 	"""
 
+	#: Incremented by L{invalidateClassGestureMaps} to invalidate the maps cached by L{_getClassGestureMap}.
+	#: @type: int
+	_classGestureMapGeneration = 0
+
 	def __init__(self):
 		#: Maps input gestures to script functions.
+		#: Initially, this is the read-only map for the class shared by all of its instances (see L{_getClassGestureMap}).
+		#: Use L{_getMutableGestureMap} to get a map which can be modified.
 		#: @type: dict
-		self._gestureMap = {}
-		# Bind gestures specified on the class.
-		for cls in reversed(self.__class__.__mro__):
-			try:
-				self.bindGestures(getattr(cls, "_%s__gestures" % cls.__name__))
-			except AttributeError:
-				pass
+		self._gestureMap = self._getClassGestureMap()
+		#: Whether L{_gestureMap} is shared with other instances.
+		#: @type: bool
+		self._gestureMapIsShared = True
 		super(ScriptableObject, self).__init__()
 
+	@classmethod
+	def _getClassGestureMap(cls):
+		"""Get the gestures bound by the C{__gestures} dicts on this class and its bases.
+		This is computed once for each class,
+		with the same result as binding the C{__gestures} dicts of each class in the MRO in reverse order.
+		@return: A map of normalized gesture identifiers to script functions.
+			This is shared, so it is read-only.
+		@rtype: L{_FrozenGestureMap}
+		"""
+		try:
+			generation, gestureMap = cls.__dict__["_classGestureMap"]
+			if generation == ScriptableObject._classGestureMapGeneration:
+				return gestureMap
+		except KeyError:
+			pass
+		# Import late to avoid circular import.
+		import inputCore
+		gestureMap = {}
+		for base in reversed(cls.__mro__):
+			for gestureIdentifier, scriptName in getattr(base, "_%s__gestures" % base.__name__, {}).iteritems():
+				gestureIdentifier = inputCore.normalizeGestureIdentifier(gestureIdentifier)
+				if not scriptName:
+					gestureMap.pop(gestureIdentifier, None)
+					continue
+				# Don't store the instance method, as this causes a circular reference
+				# and instance methods are meant to be generated on retrieval anyway.
+				func = getattr(cls, "script_%s" % scriptName, None)
+				if not func:
+					log.error("Error binding script %s in %r" % (scriptName, cls))
+					continue
+				gestureMap[gestureIdentifier] = func
+		gestureMap = _FrozenGestureMap(gestureMap)
+		cls._classGestureMap = (ScriptableObject._classGestureMapGeneration, gestureMap)
+		return gestureMap
+
+	@classmethod
+	def invalidateClassGestureMaps(cls):
+		"""Invalidate the gesture maps cached for all classes by L{_getClassGestureMap}.
+		This must be called if a C{__gestures} dict is changed after it has been used,
+		e.g. by L{browseMode.BrowseModeTreeInterceptor.addQuickNav}.
+		Existing instances are not affected.
+		"""
+		ScriptableObject._classGestureMapGeneration += 1
+
+	def _getMutableGestureMap(self):
+		"""Get L{_gestureMap}, first copying it if it is shared with other instances.
+		@rtype: dict
+		"""
+		if self._gestureMapIsShared:
+			self._gestureMap = dict(self._gestureMap)
+			self._gestureMapIsShared = False
+		return self._gestureMap
+
 	def bindGesture(self, gestureIdentifier, scriptName):
 		"""Bind an input gesture to a script.
 		@param gestureIdentifier: The identifier of the input gesture.
@@ -165,7 +312,7 @@ class ScriptableObject(AutoPropertyObject):
 			raise LookupError("No such script: %s" % func)
 		# Import late to avoid circular import.
 		import inputCore
-		self._gestureMap[inputCore.normalizeGestureIdentifier(gestureIdentifier)] = func
+		self._getMutableGestureMap()[inputCore.normalizeGestureIdentifier(gestureIdentifier)] = func
 
 	def removeGestureBinding(self,gestureIdentifier):
 		"""
@@ -176,12 +323,16 @@ class ScriptableObject(AutoPropertyObject):
 		"""
 		# Import late to avoid circular import.
 		import inputCore
-		del self._gestureMap[inputCore.normalizeGestureIdentifier(gestureIdentifier)]
+		gestureIdentifier = inputCore.normalizeGestureIdentifier(gestureIdentifier)
+		if gestureIdentifier not in self._gestureMap:
+			raise KeyError(gestureIdentifier)
+		del self._getMutableGestureMap()[gestureIdentifier]
 
 	def clearGestureBindings(self):
 		"""Remove all input gesture bindings from this object.
 		"""
-		self._gestureMap.clear()
+		self._gestureMap = {}
+		self._gestureMapIsShared = False
 
 	def bindGestures(self, gestureMap):
 		"""Bind or unbind multiple input gestures.
@@ -6,10 +6,13 @@
 
 import sys
 import itertools
+import collections
+import bisect
 import os
 import pkgutil
 import ctypes.wintypes
 import threading
+import time
 import wx
 import louis
 import winKernel
@@ -22,6 +25,7 @@ import api
 import textInfos
 import brailleDisplayDrivers
 import inputCore
+import ioExecutor
 
 #: The directory in which liblouis braille tables are located.
 TABLES_DIR = r"louis\tables"
@@ -431,6 +435,95 @@ def getDisplayList():
 		displayList.append(lastDisplay)
 	return displayList
 
+class TranslationCache(object):
+	"""A bounded, least recently used cache of liblouis translations.
+	Many regions are translated again without changing;
+	e.g. the ancestors of the focus or the current line when the cursor moves within it.
+	Cached translations are returned as tuples so that they can be shared.
+	The number of hits and misses is tracked in L{hits} and L{misses}.
+	"""
+
+	def __init__(self, maxEntries, maxTextLength):
+		"""Constructor.
+		@param maxEntries: The maximum number of translations to hold.
+		@type maxEntries: int
+		@param maxTextLength: Text longer than this is never cached.
+		@type maxTextLength: int
+		"""
+		self.maxEntries = maxEntries
+		self.maxTextLength = maxTextLength
+		self._entries = collections.OrderedDict()
+		#: The settings which affected the cached translations.
+		self._settings = None
+		#: The number of translations which were found in the cache.
+		self.hits = 0
+		#: The number of translations which were not found in the cache.
+		self.misses = 0
+
+	def translate(self, tables, text, typeform, mode, cursorPos, settings):
+		"""Translate text into braille, using a cached translation if possible.
+		The arguments are as for C{louis.translate},
+		except that C{typeform} must be C{None} or immutable.
+		@param settings: The user settings which affect translation.
+			If these have changed since the last translation, the cache is cleared.
+		@type settings: tuple
+		@return: The braille cells, a map of braille to raw positions, a map of raw to braille positions and the braille cursor position.
+		@rtype: (tuple, tuple, tuple, int)
+		"""
+		if settings != self._settings:
+			self.clear()
+			self._settings = settings
+		# The cursor position returned by liblouis is only used when compbrlAtCursor is set
+		# or when the cursor is beyond the end of the text.
+		# Otherwise, leave it out of the key so that moving the cursor doesn't force a new translation.
+		if mode & louis.compbrlAtCursor or cursorPos >= len(text):
+			keyCursorPos = cursorPos
+		else:
+			keyCursorPos = None
+		key = (tuple(tables), text, typeform, mode, keyCursorPos)
+		try:
+			translation = self._entries.pop(key)
+		except KeyError:
+			pass
+		else:
+			# Reinsert so that this becomes the most recently used entry.
+			self._entries[key] = translation
+			self.hits += 1
+			return translation
+		self.misses += 1
+		braille, brailleToRawPos, rawToBraillePos, brailleCursorPos = louis.translate(
+			tables, text, typeform=typeform, mode=mode, cursorPos=cursorPos)
+		# liblouis gives us back a character string of cells, so convert it to ints.
+		# For some reason, the highest bit is set, so only grab the lower 8 bits.
+		translation = (tuple(ord(cell) & 255 for cell in braille),
+			tuple(brailleToRawPos), tuple(rawToBraillePos), brailleCursorPos)
+		if len(text) <= self.maxTextLength:
+			self._entries[key] = translation
+			if len(self._entries) > self.maxEntries:
+				self._entries.popitem(last=False)
+		return translation
+
+	def clear(self):
+		"""Remove all entries from the cache.
+		"""
+		if self.hits or self.misses:
+			log.debug("Clearing braille translation cache: %d hits, %d misses" % (self.hits, self.misses))
+		self._entries.clear()
+		self.hits = self.misses = 0
+
+	def __len__(self):
+		return len(self._entries)
+
+#: The maximum number of translations held in L{translationCache}.
+#: @type: int
+TRANSLATION_CACHE_SIZE = 500
+#: Text longer than this isn't held in L{translationCache}.
+#: @type: int
+TRANSLATION_CACHE_MAX_TEXT_LENGTH = 2000
+#: Caches translations for L{Region.update}.
+#: @type: L{TranslationCache}
+translationCache = TranslationCache(TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_MAX_TEXT_LENGTH)
+
 class Region(object):
 	"""A region of braille to be displayed.
 	Each portion of braille to be displayed is represented by a region.
@@ -452,16 +545,20 @@ class Region(object):
 		#: @type: int
 		self.selectionEnd = None
 		#: The translated braille representation of this region.
+		#: When the region is updated, this should be replaced rather than modified in place,
+		#: as this is how L{BrailleBuffer.update} detects which regions have changed.
 		#: @type: [int, ...]
 		self.brailleCells = []
 		#: liblouis typeform flags for each character in L{rawText},
 		#: C{None} if no typeform info.
 		#: @type: [int, ...]
 		self.rawTextTypeforms = None
-		#: A list mapping positions in L{rawText} to positions in L{brailleCells}.
+		#: A sequence mapping positions in L{rawText} to positions in L{brailleCells}.
+		#: This may be shared with other regions, so it must not be modified.
 		#: @type: [int, ...]
 		self.rawToBraillePos = []
-		#: A list mapping positions in L{brailleCells} to positions in L{rawText}.
+		#: A sequence mapping positions in L{brailleCells} to positions in L{rawText}.
+		#: This may be shared with other regions, so it must not be modified.
 		#: @type: [int, ...]
 		self.brailleToRawPos = []
 		#: The position of the cursor in L{brailleCells}, C{None} if the cursor is not in this region.
@@ -489,20 +586,24 @@ class Region(object):
 		L{brailleCursorPos}, L{brailleSelectionStart} and L{brailleSelectionEnd} are similarly updated based on L{cursorPos}, L{selectionStart} and L{selectionEnd}, respectively.
 		@postcondition: L{brailleCells}, L{brailleCursorPos}, L{brailleSelectionStart} and L{brailleSelectionEnd} are updated and ready for rendering.
 		"""
+		brailleConf = config.conf["braille"]
+		table = brailleConf["translationTable"]
+		expandAtCursor = brailleConf["expandAtCursor"]
 		mode = louis.dotsIO | louis.pass1Only
-		if config.conf["braille"]["expandAtCursor"] and self.cursorPos is not None:
+		if expandAtCursor and self.cursorPos is not None:
 			mode |= louis.compbrlAtCursor
 		text=unicode(self.rawText).replace('\0','')
-		braille, self.brailleToRawPos, self.rawToBraillePos, brailleCursorPos = louis.translate(
-			[os.path.join(TABLES_DIR, config.conf["braille"]["translationTable"]),
+		# The position maps are shared with the translation cache, so they must not be modified.
+		brailleCells, self.brailleToRawPos, self.rawToBraillePos, brailleCursorPos = translationCache.translate(
+			[os.path.join(TABLES_DIR, table),
 				"braille-patterns.cti"],
 			text,
 			# liblouis mutates typeform if it is a list.
 			typeform=tuple(self.rawTextTypeforms) if isinstance(self.rawTextTypeforms, list) else self.rawTextTypeforms,
-			mode=mode, cursorPos=self.cursorPos or 0)
-		# liblouis gives us back a character string of cells, so convert it to a list of ints.
-		# For some reason, the highest bit is set, so only grab the lower 8 bits.
-		self.brailleCells = [ord(cell) & 255 for cell in braille]
+			mode=mode, cursorPos=self.cursorPos or 0,
+			settings=(table, expandAtCursor))
+		# The cells are modified below (e.g. to mark the selection), so copy them.
+		self.brailleCells = list(brailleCells)
 		# #2466: HACK: liblouis incorrectly truncates trailing spaces from its output in some cases.
 		# Detect this and add the spaces to the end of the output.
 		if self.rawText and self.rawText[-1] == " ":
@@ -1114,6 +1215,19 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 		#: The position in L{brailleCells} where the display window starts (inclusive).
 		#: @type: int
 		self.windowStartPos = 0
+		self._resetRegionPositions()
+
+	def _resetRegionPositions(self):
+		#: The visible regions as of the last call to L{update}.
+		self._updatedRegions = []
+		#: The cells of each region in L{_updatedRegions} as of the last update.
+		#: These are compared by identity to find regions which have changed.
+		self._updatedRegionCells = []
+		#: The start of each region in L{_updatedRegions} in L{brailleCells},
+		#: followed by the length of L{brailleCells}.
+		self._regionStarts = [0]
+		#: Maps each region in L{_updatedRegions} to its index.
+		self._regionIndexes = {}
 
 	def clear(self):
 		"""Clear the entire buffer.
@@ -1124,6 +1238,7 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 		self.brailleCursorPos = None
 		self.brailleCells = []
 		self.windowStartPos = 0
+		self._resetRegionPositions()
 
 	def _get_visibleRegions(self):
 		if not self.regions:
@@ -1141,13 +1256,50 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 			yield region, start, end
 			start = end
 
+	def _areRegionPositionsCurrent(self):
+		"""Whether the region positions calculated by L{update} still apply to the visible regions.
+		They won't if regions have been added or removed since the last update.
+		"""
+		updatedRegions = self._updatedRegions
+		regions = self.regions
+		if not regions:
+			return not updatedRegions
+		last = regions[-1]
+		if not updatedRegions or updatedRegions[-1] is not last:
+			return False
+		if last.hidePreviousRegions:
+			return len(updatedRegions) == 1
+		return len(updatedRegions) == len(regions)
+
 	def bufferPosToRegionPos(self, bufferPos):
+		if self._areRegionPositionsCurrent():
+			starts = self._regionStarts
+			index = max(bisect.bisect_right(starts, bufferPos) - 1, 0)
+			if index < len(self._updatedRegions):
+				return self._updatedRegions[index], bufferPos - starts[index]
+			raise LookupError("No such position")
 		for region, start, end in self.regionsWithPositions:
 			if end > bufferPos:
 				return region, bufferPos - start
 		raise LookupError("No such position")
 
 	def regionPosToBufferPos(self, region, pos, allowNearest=False):
+		if self._areRegionPositionsCurrent():
+			starts = self._regionStarts
+			index = self._regionIndexes.get(region)
+			if index is not None:
+				start = starts[index]
+				if pos < starts[index + 1] - start:
+					# The requested position is still valid within the region.
+					return start + pos
+				elif allowNearest:
+					# The position within the region isn't valid,
+					# but the region is valid, so return its start.
+					return start
+			elif allowNearest and self._updatedRegions:
+				# Resort to the start of the last region.
+				return starts[-2]
+			raise LookupError("No such position")
 		for testRegion, start, end in self.regionsWithPositions:
 			if region == testRegion:
 				if pos < end - start:
@@ -1173,7 +1325,7 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 		cellsLen = len(self.brailleCells)
 		if endPos >= cellsLen:
 			return cellsLen
-		if not config.conf["braille"]["wordWrap"]:
+		if not config.conf.getSnapshot().braille.wordWrap:
 			return endPos
 		try:
 			# Try not to split words across windows.
@@ -1272,21 +1424,43 @@ class BrailleBuffer(baseObject.AutoPropertyObject):
 			self.windowEndPos = end
 
 	def update(self):
-		self.brailleCells = []
-		self.cursorPos = None
-		start = 0
-		if log.isEnabledFor(log.IO):
-			logRegions = []
-		for region in self.visibleRegions:
-			if log.isEnabledFor(log.IO):
-				logRegions.append(region.rawText)
-			cells = region.brailleCells
-			self.brailleCells.extend(cells)
-			if region.brailleCursorPos is not None:
-				self.cursorPos = start + region.brailleCursorPos
-			start += len(cells)
+		regions = list(self.visibleRegions)
 		if log.isEnabledFor(log.IO):
-			log.io("Braille regions text: %r" % logRegions)
+			log.io("Braille regions text: %r" % [region.rawText for region in regions])
+		starts = self._regionStarts
+		regionCells = self._updatedRegionCells
+		if regions == self._updatedRegions:
+			# The same regions are visible, so only splice in the cells of regions which have changed.
+			for index, region in enumerate(regions):
+				cells = region.brailleCells
+				if cells is regionCells[index]:
+					continue
+				regionCells[index] = cells
+				start = starts[index]
+				end = starts[index + 1]
+				self.brailleCells[start:end] = cells
+				delta = len(cells) - (end - start)
+				if delta:
+					for followingIndex in xrange(index + 1, len(starts)):
+						starts[followingIndex] += delta
+		else:
+			self.brailleCells = []
+			self._updatedRegions = regions
+			regionCells = self._updatedRegionCells = []
+			starts = self._regionStarts = [0]
+			self._regionIndexes = regionIndexes = {}
+			for index, region in enumerate(regions):
+				regionIndexes.setdefault(region, index)
+				cells = region.brailleCells
+				regionCells.append(cells)
+				self.brailleCells.extend(cells)
+				starts.append(len(self.brailleCells))
+		self.cursorPos = None
+		for index in xrange(len(regions) - 1, -1, -1):
+			brailleCursorPos = regions[index].brailleCursorPos
+			if brailleCursorPos is not None:
+				self.cursorPos = starts[index] + brailleCursorPos
+				break
 
 	def updateDisplay(self):
 		if self is self.handler.buffer:
@@ -1443,6 +1617,66 @@ def formatCellsForLog(cells):
 		if cell else "-"
 		for cell in cells])
 
+class _DisplayWriter(object):
+	"""Writes braille cells to a display, only sending the cells which changed since the last write.
+	If nothing changed, nothing is sent.
+	If the driver implements L{BrailleDisplayDriver.displayPartial},
+	only the span from the first to the last changed cell is sent.
+	Otherwise, all cells are sent with L{BrailleDisplayDriver.display}.
+	For thread-safe drivers, this is only used in the background thread.
+	"""
+
+	def __init__(self, display):
+		self.display = display
+		#: The cells last sent to the display, C{None} if unknown.
+		self._lastCells = None
+		#: Whether the display might support partial updates.
+		self._canDisplayPartial = True
+		#: The number of writes which sent all cells.
+		self.fullWrites = 0
+		#: The number of writes which sent only the changed cells.
+		self.partialWrites = 0
+		#: The number of writes which were skipped because nothing changed.
+		self.skippedWrites = 0
+		#: The total number of cells sent to the display.
+		self.cellsSent = 0
+
+	def write(self, cells):
+		"""Write cells to the display.
+		@param cells: The cells for the entire display.
+			These must not be modified after they are written.
+		@type cells: [int, ...]
+		"""
+		lastCells = self._lastCells
+		cellsLen = len(cells)
+		if lastCells is not None and len(lastCells) == cellsLen:
+			start = 0
+			while start < cellsLen and cells[start] == lastCells[start]:
+				start += 1
+			if start == cellsLen:
+				self.skippedWrites += 1
+				return
+			end = cellsLen
+			while cells[end - 1] == lastCells[end - 1]:
+				end -= 1
+			if self._canDisplayPartial and end - start < cellsLen:
+				try:
+					self.display.displayPartial(start, cells[start:end])
+				except NotImplementedError:
+					self._canDisplayPartial = False
+				else:
+					self._lastCells = cells
+					self.partialWrites += 1
+					self.cellsSent += end - start
+					return
+		# Forget the last cells until the write succeeds,
+		# since it isn't known what the display shows if it fails.
+		self._lastCells = None
+		self.display.display(cells)
+		self._lastCells = cells
+		self.fullWrites += 1
+		self.cellsSent += cellsLen
+
 class BrailleHandler(baseObject.AutoPropertyObject):
 	TETHER_FOCUS = "focus"
 	TETHER_REVIEW = "review"
@@ -1462,11 +1696,19 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 		self._cursorBlinkUp = True
 		self._cells = []
 		self._cursorBlinkTimer = None
+		#: Sends cells to L{display}; see L{_DisplayWriter}.
+		self._displayWriter = None
+		#: When cells were last written, used to coalesce bursts of writes.
+		self._lastWriteTime = 0
+		#: Cells waiting to be written at the end of the current coalescing interval.
+		self._pendingWriteCells = None
+		self._pendingWriteCallLater = None
 
 	def terminate(self):
 		if self._messageCallLater:
 			self._messageCallLater.Stop()
 			self._messageCallLater = None
+		self._cancelPendingWrite()
 		if self._cursorBlinkTimer:
 			self._cursorBlinkTimer.Stop()
 			self._cursorBlinkTimer = None
@@ -1489,6 +1731,8 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 			self.handleGainFocus(api.getFocusObject())
 
 	def setDisplayByName(self, name, isFallback=False):
+		# Cells pending for the old display shouldn't be written to the new one.
+		self._cancelPendingWrite()
 		if not name:
 			self.display = None
 			self.displaySize = 0
@@ -1521,6 +1765,7 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 					except:
 						log.error("Error terminating previous display driver", exc_info=True)
 				self.display = newDisplay
+			self._displayWriter = _DisplayWriter(newDisplay)
 			self.displaySize = newDisplay.numCells
 			self.enabled = bool(self.displaySize)
 			if not isFallback:
@@ -1547,9 +1792,40 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 			self._cursorBlinkTimer.Start(blinkRate)
 
 	def _writeCells(self, cells):
+		interval = config.conf["braille"]["writeCoalesceInterval"]
+		if interval:
+			if self._pendingWriteCallLater:
+				# A write is already scheduled for the end of this burst, so just replace its cells.
+				self._pendingWriteCells = cells
+				return
+			remaining = interval - (time.time() - self._lastWriteTime) * 1000
+			if remaining > 0:
+				# The previous write was too recent.
+				# Write at the end of the interval, along with any later writes.
+				self._pendingWriteCells = cells
+				self._pendingWriteCallLater = wx.CallLater(int(remaining) + 1, self._writePendingCells)
+				return
+			self._lastWriteTime = time.time()
+		self._sendCells(cells)
+
+	def _cancelPendingWrite(self):
+		if self._pendingWriteCallLater:
+			self._pendingWriteCallLater.Stop()
+			self._pendingWriteCallLater = None
+		self._pendingWriteCells = None
+
+	def _writePendingCells(self):
+		cells = self._pendingWriteCells
+		self._pendingWriteCells = None
+		self._pendingWriteCallLater = None
+		self._lastWriteTime = time.time()
+		if self.display:
+			self._sendCells(cells)
+
+	def _sendCells(self, cells):
 		if not self.display.isThreadSafe:
 			try:
-				self.display.display(cells)
+				self._displayWriter.write(cells)
 			except:
 				log.error("Error displaying cells. Disabling display", exc_info=True)
 				self.setDisplayByName("noBraille", isFallback=True)
@@ -1743,62 +2019,56 @@ class BrailleHandler(baseObject.AutoPropertyObject):
 
 class _BgThread:
 	"""A singleton background thread used for background writes and raw braille display I/O.
+	The thread is run by an L{ioExecutor.Executor}; see L{executorClass}.
 	"""
 
-	thread = None
-	exit = False
+	#: The executor used to run the thread.
+	#: L{hwIo} requires L{ioExecutor.ApcExecutor},
+	#: but L{ioExecutor.QueueExecutor} can be used with drivers which don't use L{hwIo}.
+	#: @type: type
+	executorClass = ioExecutor.ApcExecutor
+	#: The running executor, C{None} if the thread isn't running.
+	#: @type: L{ioExecutor.Executor}
+	_executor = None
 	queuedWrite = None
 
 	@classmethod
 	def start(cls):
-		if cls.thread:
+		if cls._executor:
 			return
 		cls.queuedWriteLock = threading.Lock()
-		thread = cls.thread = threading.Thread(target=cls.func)
-		thread.daemon = True
-		thread.start()
-		cls.handle = ctypes.windll.kernel32.OpenThread(winKernel.THREAD_SET_CONTEXT, False, thread.ident)
+		executor = cls.executorClass()
+		executor.start()
+		cls._executor = executor
 
 	@classmethod
 	def queueApc(cls, func):
-		ctypes.windll.kernel32.QueueUserAPC(func, cls.handle, 0)
+		"""Queue a function to be run on the background thread.
+		@param func: The function, which takes a single integer argument.
+			With L{ioExecutor.ApcExecutor}, this must be a C{winKernel.PAPCFUNC}.
+		"""
+		cls._executor.queue(func)
 
 	@classmethod
 	def stop(cls):
-		if not cls.thread:
+		if not cls._executor:
 			return
-		cls.exit = True
-		# Wake up the thread. It will exit when it sees exit is True.
-		cls.queueApc(cls.executor)
-		cls.thread.join()
-		cls.exit = False
-		winKernel.closeHandle(cls.handle)
-		cls.handle = None
-		cls.thread = None
+		cls._executor.stop()
+		cls._executor = None
 
 	@winKernel.PAPCFUNC
 	def executor(param):
-		if _BgThread.exit:
-			# func will see this and exit.
-			return
 		with _BgThread.queuedWriteLock:
 			data = _BgThread.queuedWrite
 			_BgThread.queuedWrite = None
 		if not data:
 			return
 		try:
-			handler.display.display(data)
+			handler._displayWriter.write(data)
 		except:
 			log.error("Error displaying cells. Disabling display", exc_info=True)
 			handler.setDisplayByName("noBraille", isFallback=True)
 
-	@classmethod
-	def func(cls):
-		while True:
-			ctypes.windll.kernel32.SleepEx(winKernel.INFINITE, True)
-			if cls.exit:
-				break
-
 def initialize():
 	global handler
 	config.addConfigDirsToPythonPackagePath(brailleDisplayDrivers)
@@ -1896,6 +2166,19 @@ class BrailleDisplayDriver(baseObject.AutoPropertyObject):
 		@type cells: [int, ...]
 		"""
 
+	def displayPartial(self, start, cells):
+		"""Display some braille cells, leaving the rest of the display unchanged.
+		Drivers should implement this if the display can update part of its cells,
+		as less needs to be sent when only a few cells change; e.g. when the cursor blinks.
+		Otherwise, L{display} is used for every write.
+		@param start: The position on the display of the first cell.
+		@type start: int
+		@param cells: The braille cells to display from C{start}.
+		@type cells: [int, ...]
+		@raise NotImplementedError: If the display can't update part of its cells.
+		"""
+		raise NotImplementedError
+
 	#: Automatic port constant to be used by braille displays that support the "automatic" port
 	#: @type: Tupple
 	# Translators: String representing the automatic port selection for braille displays.
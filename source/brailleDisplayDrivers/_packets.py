@@ -0,0 +1,189 @@
+#brailleDisplayDrivers/_packets.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Helpers for encoding braille cells when building packets for braille displays.
+These work on whole rows of cells at once using C{bytearray} and C{str.translate},
+rather than converting each cell in Python code.
+There is also L{EscapedFrameParser} for splitting received data into packets.
+"""
+
+from logHandler import log
+
+def cellsToBytes(cells):
+	"""Convert braille cells to a byte string.
+	@param cells: The cells, each an integer from 0 to 255.
+	@type cells: [int, ...]
+	@rtype: str
+	"""
+	return str(bytearray(cells))
+
+def makeCellTable(func):
+	"""Make a table which maps each of the 256 possible cells to another byte.
+	This is typically used when a display orders its dots differently.
+	@param func: Called with each cell to get the byte it maps to.
+	@type func: callable(int) -> int
+	@return: A table for use with L{translateCells}.
+	@rtype: str
+	"""
+	return str(bytearray(func(cell) for cell in xrange(256)))
+
+def translateCells(cells, table):
+	"""Convert braille cells to a byte string, mapping each cell using a table.
+	@param cells: The cells.
+	@type cells: [int, ...]
+	@param table: A table from L{makeCellTable}.
+	@type table: str
+	@rtype: str
+	"""
+	return str(bytearray(cells)).translate(table)
+
+def makeCellStringMap(func):
+	"""Make a map from each of the 256 possible cells to a string,
+	for displays which encode each cell as more than one byte.
+	@param func: Called with each cell to get the string it maps to.
+	@type func: callable(int) -> str
+	@return: A map for use with L{encodeCells}.
+	@rtype: tuple
+	"""
+	return tuple(func(cell) for cell in xrange(256))
+
+def encodeCells(cells, cellMap):
+	"""Convert braille cells to a byte string using a map of cells to strings.
+	@param cells: The cells.
+	@type cells: [int, ...]
+	@param cellMap: A map from L{makeCellStringMap}.
+	@type cellMap: tuple
+	@rtype: str
+	"""
+	return "".join(map(cellMap.__getitem__, cells))
+
+def reverseDots(cell):
+	"""Reverse the order of the dots in a cell, so that dot 1 becomes dot 8 and so on.
+	@type cell: int
+	@rtype: int
+	"""
+	return int("{:08b}".format(cell)[::-1], 2)
+
+def escape(data, escapeChar):
+	"""Double every occurrence of an escape character in some data,
+	as needed by protocols which use the character to start a packet.
+	@param data: The data to escape.
+	@type data: str
+	@param escapeChar: The escape character.
+	@type escapeChar: str
+	@rtype: str
+	"""
+	return data.replace(escapeChar, escapeChar * 2)
+
+class EscapedFrameParser(object):
+	"""Incrementally splits received data into packets for protocols where each packet starts with an escape character.
+	Each packet consists of the escape character, a command byte and a payload.
+	Escape characters in the payload are doubled.
+	Data can be fed in chunks of any size, so a driver can read whatever is available
+	rather than reading a byte at a time.
+	Data before an escape character is ignored.
+	If a new packet starts before the current one is complete, the current one is discarded.
+	"""
+
+	def __init__(self, escapeChar, getPayloadLength, onPacket, maxPayloadLength=256):
+		"""Constructor.
+		@param escapeChar: The escape character.
+		@type escapeChar: str
+		@param getPayloadLength: Called with the command and the (unescaped) payload received so far
+			to get the total length of the payload.
+			This is called when the command is received and again each time the payload reaches the returned length,
+			so the length can depend on the content of the payload.
+		@type getPayloadLength: callable(str, str) -> int
+		@param onPacket: Called with the command and (unescaped) payload of each complete packet.
+		@type onPacket: callable(str, str)
+		@param maxPayloadLength: Packets with longer payloads are discarded,
+			so that bad data can't cause unbounded buffering.
+		@type maxPayloadLength: int
+		"""
+		self.escapeChar = escapeChar
+		self._getPayloadLength = getPayloadLength
+		self._onPacket = onPacket
+		self.maxPayloadLength = maxPayloadLength
+		self.reset()
+
+	def reset(self):
+		"""Discard any partially received packet.
+		"""
+		#: The command of the current packet, C{None} if waiting for the command,
+		#: C{False} if waiting for an escape character.
+		self._command = False
+		self._payload = ""
+		self._payloadLength = 0
+		#: Whether an escape character was received in the payload and the next byte is needed to tell what it means.
+		self._gotEscape = False
+
+	def feed(self, data):
+		"""Process received data, calling the onPacket callback for each packet completed.
+		@param data: The data.
+		@type data: str
+		"""
+		escapeChar = self.escapeChar
+		pos = 0
+		dataLen = len(data)
+		while pos < dataLen:
+			if self._command is False:
+				index = data.find(escapeChar, pos)
+				if index == -1:
+					log.debugWarning("Ignoring data before escape: %r" % data[pos:])
+					return
+				if index > pos:
+					log.debugWarning("Ignoring data before escape: %r" % data[pos:index])
+				pos = index + 1
+				self._command = None
+			elif self._command is None:
+				self._startPacket(data[pos])
+				pos += 1
+			elif self._gotEscape:
+				self._gotEscape = False
+				if data[pos] != escapeChar:
+					# This is the command of a new packet.
+					log.debugWarning("Discarding incomplete packet: command %r, payload %r"
+						% (self._command, self._payload))
+					self._command = None
+					continue
+				pos += 1
+				self._payload += escapeChar
+				self._checkComplete()
+			else:
+				end = pos + self._payloadLength - len(self._payload)
+				index = data.find(escapeChar, pos, end)
+				if index == -1:
+					self._payload += data[pos:end]
+					pos = end
+					self._checkComplete()
+				else:
+					self._payload += data[pos:index]
+					pos = index + 1
+					self._gotEscape = True
+
+	def _startPacket(self, command):
+		self._command = command
+		self._payload = ""
+		self._payloadLength = 0
+		self._checkComplete()
+
+	def _checkComplete(self):
+		# The payload length can depend on the payload, so check it again each time the expected length is reached.
+		while len(self._payload) >= self._payloadLength:
+			length = self._getPayloadLength(self._command, self._payload)
+			if length <= self._payloadLength:
+				break
+			if length > self.maxPayloadLength:
+				log.debugWarning("Discarding packet with payload length %d: command %r"
+					% (length, self._command))
+				self.reset()
+				return
+			self._payloadLength = length
+		else:
+			return
+		command, payload = self._command, self._payload
+		self.reset()
+		self._onPacket(command, payload)
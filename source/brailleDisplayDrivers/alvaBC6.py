@@ -5,6 +5,7 @@
 #Copyright (C) 2009-2011 Optelec B.V. <http://www.optelec.com/>, James Teh <jamie@jantrid.net>
 
 import braille
+from . import _packets
 import queueHandler
 from logHandler import log
 from ctypes import *
@@ -82,7 +83,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 		return self._alva_NumCells
 
 	def display(self, cells):
-		cells="".join([chr(x) for x in cells])
+		cells=_packets.cellsToBytes(cells)
 		AlvaLib.AlvaSendBraille(0, cells, 0, len(cells))
 
 	def _keyCallback(self, dev, key, userData):
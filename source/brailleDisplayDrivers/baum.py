@@ -10,6 +10,7 @@ from collections import OrderedDict
 from cStringIO import StringIO
 import hwPortUtils
 import braille
+from . import _packets
 import inputCore
 from logHandler import log
 import brailleInput
@@ -17,6 +18,8 @@ import hwIo
 
 TIMEOUT = 0.2
 BAUD_RATE = 19200
+#: The maximum number of bytes to read from a serial port at once.
+READ_CHUNK_SIZE = 64
 
 ESCAPE = "\x1b"
 
@@ -186,7 +189,9 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 				if self.isHid:
 					self._dev = hwIo.Hid(port, onReceive=self._onReceive)
 				else:
-					self._dev = hwIo.Serial(port, baudrate=BAUD_RATE, timeout=TIMEOUT, writeTimeout=TIMEOUT, onReceive=self._onReceive)
+					self._parser = _packets.EscapedFrameParser(ESCAPE, self._getPayloadLength, self._handleResponse)
+					self._dev = hwIo.Serial(port, baudrate=BAUD_RATE, timeout=TIMEOUT, writeTimeout=TIMEOUT,
+						onReceive=self._onReceive, readChunkSize=READ_CHUNK_SIZE)
 			except EnvironmentError:
 				continue
 			if self.isHid:
@@ -245,27 +250,29 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 			self._dev.write(command + arg)
 		else:
 			self._dev.write("\x1b{command}{arg}".format(command=command,
-				arg=arg.replace(ESCAPE, ESCAPE * 2)))
+				arg=_packets.escape(arg, ESCAPE)))
 
-	def _onReceive(self, data):
-		if self.isHid:
-			# data contains the entire packet.
-			stream = StringIO(data)
-		else:
-			if data != ESCAPE:
-				log.debugWarning("Ignoring byte before escape: %r" % data)
-				return
-			# data only contained the escape. Read the rest from the device.
-			stream = self._dev
-		command = stream.read(1)
-		length = BAUM_RSP_LENGTHS.get(command, 0)
+	def _getPayloadLength(self, command, arg):
 		if command == BAUM_ROUTING_KEYS:
-			length = 10 if self.numCells > 40 else 5
-		arg = stream.read(length)
+			return 10 if self.numCells > 40 else 5
 		if command == BAUM_DEVICE_ID and arg == "Refreshabraille ":
 			# For most Baum devices, the argument is 16 bytes,
 			# but it is 18 bytes for the Refreshabraille.
-			arg += stream.read(2)
+			return 18
+		return BAUM_RSP_LENGTHS.get(command, 0)
+
+	def _onReceive(self, data):
+		if not self.isHid:
+			# data is whatever was available, which might contain partial or multiple packets.
+			self._parser.feed(data)
+			return
+		# data contains the entire packet.
+		stream = StringIO(data)
+		command = stream.read(1)
+		arg = stream.read(self._getPayloadLength(command, ""))
+		length = self._getPayloadLength(command, arg)
+		if length > len(arg):
+			arg += stream.read(length - len(arg))
 		self._handleResponse(command, arg)
 
 	def _handleResponse(self, command, arg):
@@ -308,7 +315,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 
 	def display(self, cells):
 		# cells will already be padded up to numCells.
-		self._sendRequest(BAUM_DISPLAY_DATA, "".join(chr(cell) for cell in cells))
+		self._sendRequest(BAUM_DISPLAY_DATA, _packets.cellsToBytes(cells))
 
 	gestureMap = inputCore.GlobalGestureMap({
 		"globalCommands.GlobalCommands": {
@@ -13,6 +13,7 @@ import itertools
 import serial
 import wx
 import braille
+from . import _packets
 import brailleInput
 import hwPortUtils
 import inputCore
@@ -245,9 +246,9 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 		if self._serial is None:
 			return
 		# ESCAPE must be quoted because it is a control character
-		cells = [chr(cell).replace(ESCAPE, ESCAPE * 2) for cell in cells]
+		cells = _packets.escape(_packets.cellsToBytes(cells), ESCAPE)
 		try:
-			self._serial.write(DISPLAY_TAG + "".join(cells))
+			self._serial.write(DISPLAY_TAG + cells)
 		except serial.SerialException, e:
 			self._closeComPort()
 			raise
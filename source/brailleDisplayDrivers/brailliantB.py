@@ -10,6 +10,7 @@ import itertools
 import serial
 import hwPortUtils
 import braille
+from . import _packets
 import inputCore
 from logHandler import log
 import brailleInput
@@ -228,7 +229,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 
 	def display(self, cells):
 		# cells will already be padded up to numCells.
-		cells = "".join(chr(cell) for cell in cells)
+		cells = _packets.cellsToBytes(cells)
 		if self.isHid:
 			self._dev.write("{id}"
 				"\x01\x00" # Module 1, offset 0
@@ -7,6 +7,7 @@
 import time
 import wx
 import braille
+from . import _packets
 from logHandler import log
 import inputCore
 try:
@@ -62,7 +63,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 		return self._con.displaySize[0]
 
 	def display(self, cells):
-		cells = "".join(chr(cell) for cell in cells)
+		cells = _packets.cellsToBytes(cells)
 		# HACK: Temporarily work around a bug which causes brltty to freeze if data is written while there are key presses waiting.
 		# Simply consume and act upon any waiting key presses.
 		self._handleKeyPresses()
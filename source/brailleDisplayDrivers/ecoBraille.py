@@ -7,6 +7,7 @@
 
 import inputCore
 import braille
+from . import _packets
 import hwPortUtils
 from collections import OrderedDict
 from logHandler import log
@@ -134,6 +135,9 @@ output_dots_map=[0x00, 0x10, 0x20, 0x30, 0x40, 0x50, 0x60, 0x70,
 	0x8E, 0x9E, 0xAE, 0xBE, 0xCE, 0xDE, 0xEE, 0xFE,
 	0x8F, 0x9F, 0xAF, 0xBF, 0xCF, 0xDF, 0xEF, 0xFF]
 
+#: A table for L{_packets.translateCells} built from L{output_dots_map}.
+OUTPUT_DOTS_TABLE = _packets.makeCellTable(output_dots_map.__getitem__)
+
 def eco_out(cells):
 	# Messages sends to EcoBraille display are something like that:
 	# 0x10 0x02 0xBC message 0x10 0x03
@@ -141,8 +145,7 @@ def eco_out(cells):
 	ret.append(struct.pack('BBB', 0x10, 0x02, 0xBC))
 	# Leave status cells blank
 	ret.append(struct.pack('BBBBB', 0x00, 0x00, 0x00, 0x00, 0x00))
-	for d in cells:
-		ret.append(struct.pack('B', output_dots_map[d]))
+	ret.append(_packets.translateCells(cells, OUTPUT_DOTS_TABLE))
 	ret.append(struct.pack('BB', 0x10, 0x03))
 	return "".join(ret)
 
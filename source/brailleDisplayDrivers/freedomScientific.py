@@ -10,6 +10,7 @@ from collections import OrderedDict
 import itertools
 import hwPortUtils
 import braille
+from . import _packets
 import inputCore
 from baseObject import ScriptableObject
 from winUser import WNDCLASSEXW, WNDPROC, LRESULT, HCURSOR
@@ -193,9 +194,13 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver,ScriptableObject):
 		return fbGetCellCount(self.fbHandle)
 
 	def display(self,cells):
-		cells="".join([chr(x) for x in cells])
+		cells=_packets.cellsToBytes(cells)
 		fbWrite(self.fbHandle,0,len(cells),cells)
 
+	def displayPartial(self,start,cells):
+		cells=_packets.cellsToBytes(cells)
+		fbWrite(self.fbHandle,start,len(cells),cells)
+
 	def _configureDisplay(self):
 		# See what display we are connected to
 		displayName= firmwareVersion=""
@@ -14,6 +14,7 @@ import time
 import wx
 import serial
 import braille
+from . import _packets
 import inputCore
 import hwPortUtils
 from logHandler import log
@@ -93,7 +94,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 
 	def display(self, cells):
 		# every transmitted line consists of the preamble HEDO_MOBIL_INIT, the statusCells and the Cells
-		line = chr(HEDO_MOBIL_INIT) + chr(0) * HEDO_MOBIL_STATUS_CELL_COUNT + "".join(chr(cell) for cell in cells)
+		line = chr(HEDO_MOBIL_INIT) + chr(0) * HEDO_MOBIL_STATUS_CELL_COUNT + _packets.cellsToBytes(cells)
 		# cells are already padded up numCells
 		# thus the expected length of the line is 1 + HEDO_MOBIL_STATUS_CELL_COUNT + HEDO_MOBIL_CELL_COUNT
 		# ... just how it should be
@@ -14,6 +14,7 @@ import time
 import wx
 import serial
 import braille
+from . import _packets
 import inputCore
 import hwPortUtils
 from logHandler import log
@@ -115,7 +116,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 
 	def display(self, cells):
 		# every transmitted line consists of the preamble HEDO_INIT, the statusCells and the Cells
-		line = chr(HEDO_INIT) + chr(0) * HEDO_STATUS_CELL_COUNT + "".join(chr(cell) for cell in cells)
+		line = chr(HEDO_INIT) + chr(0) * HEDO_STATUS_CELL_COUNT + _packets.cellsToBytes(cells)
 
 		# cells will be padded up to 1 + numStatusCells + numCells.
 		expectedLength = 1 + HEDO_STATUS_CELL_COUNT + HEDO_CELL_COUNT
@@ -9,13 +9,13 @@ from ctypes import *
 import inputCore
 import wx
 import braille
+from . import _packets
 
 try:
 	lilliDll=windll.LoadLibrary("brailleDisplayDrivers\\lilli.dll")
 except:
 	lilliDll=None
 
-lilliCellsMap=[]
 KEY_CHECK_INTERVAL = 50
 
 LILLI_KEYS = [
@@ -38,6 +38,8 @@ def convertLilliCells(cell):
 		(1<<4 if cell & 1<<7  else 0))
 	return newCell
 
+lilliCellsTable=_packets.makeCellTable(convertLilliCells)
+
 class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 	name = "lilli"
 	# Translators: Name of a braille display.
@@ -48,9 +50,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 		return bool(lilliDll)
 
 	def  __init__(self):
-		global lilliCellsMap
 		super(BrailleDisplayDriver, self).__init__()
-		lilliCellsMap=[convertLilliCells(x) for x in xrange(256)]
 		if (lilliDll.Init408USB()):
 			self._keyCheckTimer = wx.PyTimer(self._handleKeyPresses)
 			self._keyCheckTimer.Start(KEY_CHECK_INTERVAL)
@@ -89,7 +89,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 			pass
 
 	def display(self, cells):
-		cells="".join(chr(lilliCellsMap[x]) for x in cells)
+		cells=_packets.translateCells(cells, lilliCellsTable)
 		lilliDll.WriteBuf(cells) 
 
 	gestureMap = inputCore.GlobalGestureMap({
@@ -10,6 +10,7 @@ import time
 import itertools
 import wx
 import braille
+from . import _packets
 from logHandler import log
 
 import inputCore
@@ -55,6 +56,13 @@ def brl_auto_id():
 	return struct.pack('bbbbb',STX,AUTOID,0x50,0x50,ETX)
 	#device will respond with a message that allows identification of the display
 
+def _encodeBrlOutCell(cell):
+	cell = _packets.reverseDots(cell)
+	return struct.pack('BB', 0x30 | (cell >> 4), 0x30 | (cell & 0x0F))
+
+#: Maps cells to the bytes sent for them by L{brl_out}.
+BRL_OUT_CELL_MAP = _packets.makeCellStringMap(_encodeBrlOutCell)
+
 def brl_out(data,nrk,nlk,nv):
 	"""write data to braille cell with nv vertical cells, nrk cells right and nlk cells left
 	some papenmeier displays have vertical cells, other displays have dummy cells with keys
@@ -70,20 +78,8 @@ def brl_out(data,nrk,nlk,nv):
 	#fill dummy bytes (left,vertical)
 	ret.append(struct.pack('BB',0x30,0x30)*nv)
 	ret.append(struct.pack('BBBB',0x30,0x30,0x30,0x30)*nlk)
-	#swap dot bits
-	for d in data:
-		d2 = 0
-		if(d & 1): d2|=128
-		if(d & 2): d2|=64
-		if(d & 4): d2|=32
-		if(d & 8): d2|=16
-		if(d & 16): d2|=8
-		if(d & 32): d2|=4
-		if(d & 64): d2|=2
-		if(d & 128): d2|=1
-		a = 0x30|(d2 & 0x0F)
-		b = 0x30|(d2 >> 4)
-		ret.append(struct.pack('BB',b,a))
+	#swap dot bits and split each cell into two bytes
+	ret.append(_packets.encodeCells(data, BRL_OUT_CELL_MAP))
 	#fill dummy bytes on (right)
 	ret.append(struct.pack('BBBB',0x30,0x30,0x30,0x30)*nrk)
 	#ETX
@@ -430,7 +426,7 @@ connection could not be established"""
 	def display(self, cells):
 		"""write to braille display"""
 		if(self._brxnvda):
-			newcells = "".join([chr(cell) for cell in cells])
+			newcells = _packets.cellsToBytes(cells)
 			self._brxnvda.brxnvda_sendToDisplay(newcells)
 			return
 		if(self._dev is None): return
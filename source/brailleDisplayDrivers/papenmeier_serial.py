@@ -12,6 +12,7 @@ import time
 import itertools
 import wx
 import braille
+from . import _packets
 import hwPortUtils
 from logHandler import log
 from baseObject import ScriptableObject
@@ -40,8 +41,7 @@ def brl_out(offset, data):
 	d2 = len(data)+7
 	ret.append(struct.pack('BB', offset / 256, offset % 256))
 	ret.append(struct.pack('BB', 0, d2 % 256))
-	for d in data:
-		ret.append(struct.pack('B', d))
+	ret.append(_packets.cellsToBytes(data))
 	ret.append(struct.pack('B', ETX))
 	return "".join(ret)
 
@@ -17,6 +17,7 @@ import time
 import wx
 import serial
 import braille
+from . import _packets
 import inputCore
 import hwPortUtils
 from logHandler import log
@@ -94,9 +95,12 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 	def display(self, cells):
 		# every transmitted line consists of the preamble SEIKA_SENDHEADER and the Cells
 		if self.numCells==80:
-			line = "\xff\xff\x73\x38\x30\x00\x00\x00"+"".join(chr(cell) for cell in cells)
+			line = "\xff\xff\x73\x38\x30\x00\x00\x00"+_packets.cellsToBytes(cells)
 		else:
-			line = self.s40+"".join("\0"+chr(cell) for cell in cells)
+			# Each cell is preceded by a 0 byte.
+			line = bytearray(2 * len(cells))
+			line[1::2] = cells
+			line = self.s40+str(line)
 		self._ser.write(line)
 
 	def handleResponses(self):
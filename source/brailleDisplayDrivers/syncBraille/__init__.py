@@ -8,6 +8,7 @@ from logHandler import log
 from ctypes import *
 from ctypes.wintypes import *
 import braille
+from .. import _packets
 import inputCore
 from winUser import WNDCLASSEXW, WNDPROC, LRESULT, HCURSOR
 
@@ -93,7 +94,7 @@ class BrailleDisplayDriver(braille.BrailleDisplayDriver):
 		return himsSyncBrailleLib.GetCellCount()
 
 	def display(self, cells):
-		cells = "".join([chr(x) for x in cells])
+		cells = _packets.cellsToBytes(cells)
 		himsSyncBrailleLib.SendSyncBrl(cells)
 
 	gestureMap = inputCore.GlobalGestureMap({
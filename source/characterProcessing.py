@@ -8,7 +8,11 @@ import time
 import os
 import codecs
 import collections
+import itertools
 import re
+import cPickle
+import threading
+import Queue
 from logHandler import log
 import globalVars
 
@@ -21,6 +25,9 @@ class LocaleDataMap(object):
 		""" 
 		self._localeDataFactory=localeDataFactory
 		self._dataMap={}
+		#: Incremented whenever data is invalidated,
+		#: so that data created in the background from stale information can be discarded.
+		self._invalidationCount=0
 
 	def fetchLocaleData(self,locale,fallback=True):
 		"""
@@ -44,21 +51,125 @@ class LocaleDataMap(object):
 			except LookupError:
 				data=None
 			if not data: continue
-			self._dataMap[l]=data
-			return data
+			# The data might have been created in the background while we were creating it.
+			return self._dataMap.setdefault(l,data)
 		raise LookupError(locale)
 
+	def prefetchLocaleData(self, locale):
+		"""Create and store a data object for the given locale if it doesn't exist yet, without falling back to other locales.
+		This is safe to call from a background thread.
+		If data is invalidated while the data object is being created, it is discarded,
+		since it might have been created from stale information.
+		@param locale: The locale of the data object.
+		@type locale: str
+		@return: C{True} if there is data for the locale, C{False} if not.
+		@rtype: bool
+		"""
+		if locale in self._dataMap:
+			return True
+		invalidationCount = self._invalidationCount
+		try:
+			data = self._localeDataFactory(locale)
+		except LookupError:
+			data = None
+		if not data:
+			return False
+		if invalidationCount == self._invalidationCount:
+			self._dataMap.setdefault(locale, data)
+		return True
+
+	def isLocaleDataLoaded(self, locale):
+		"""Determine whether a data object for the given locale has already been created.
+		@param locale: The locale in question.
+		@type locale: str
+		@rtype: bool
+		"""
+		return locale in self._dataMap
+
+	def setLocaleData(self, locale, data):
+		"""Store a data object for the given locale which was created elsewhere,
+		unless one has already been stored.
+		@param locale: The locale of the data object.
+		@type locale: str
+		@param data: The data object.
+		@return: The data object now stored for the locale.
+		"""
+		return self._dataMap.setdefault(locale, data)
+
 	def invalidateLocaleData(self, locale):
 		"""Invalidate the data object (if any) for the given locale.
 		This will cause a new data object to be created when this locale is next requested.
 		@param locale: The locale for which the data object should be invalidated.
 		@type locale: str
 		"""
+		self._invalidationCount += 1
 		try:
 			del self._dataMap[locale]
 		except KeyError:
 			pass
 
+#: Incremented whenever the format of the data in the on-disk cache changes.
+CACHE_VERSION = 1
+
+def _getCacheFileName(name):
+	return os.path.join(globalVars.appArgs.configPath, "characterProcessingCache", "%s.pickle" % name)
+
+def _getFileStamps(fileNames):
+	"""Get information identifying the current version of some files.
+	@param fileNames: The names of the files.
+	@type fileNames: list of str
+	@return: The name, modification time and size of each file, with time and size C{None} if the file doesn't exist.
+	@rtype: tuple
+	"""
+	stamps = []
+	for fileName in fileNames:
+		try:
+			stat = os.stat(fileName)
+		except OSError:
+			stamps.append((fileName, None, None))
+		else:
+			stamps.append((fileName, stat.st_mtime, stat.st_size))
+	return tuple(stamps)
+
+def _loadCache(name, stamps):
+	"""Load parsed data from the on-disk cache.
+	@param name: The name of the cached data.
+	@type name: str
+	@param stamps: The stamps (see L{_getFileStamps}) of the files the data was parsed from.
+	@return: The cached data or C{None} if there is no cached data for the current version of the source files.
+	"""
+	try:
+		with open(_getCacheFileName(name), "rb") as f:
+			version, cachedStamps, data = cPickle.load(f)
+	except IOError:
+		return None
+	except:
+		log.debugWarning("Error loading %s from cache" % name, exc_info=True)
+		return None
+	if version != CACHE_VERSION or cachedStamps != stamps:
+		return None
+	return data
+
+def _saveCache(name, stamps, data):
+	"""Save parsed data to the on-disk cache.
+	@param name: The name of the cached data.
+	@type name: str
+	@param stamps: The stamps (see L{_getFileStamps}) of the files the data was parsed from,
+		taken before they were parsed.
+	@param data: The data to cache.
+	"""
+	if globalVars.appArgs.secure:
+		return
+	fileName = _getCacheFileName(name)
+	try:
+		dirName = os.path.dirname(fileName)
+		if not os.path.isdir(dirName):
+			os.makedirs(dirName)
+		with open(fileName, "wb") as f:
+			cPickle.dump((CACHE_VERSION, stamps, data), f, cPickle.HIGHEST_PROTOCOL)
+	except (IOError, OSError):
+		log.debugWarning("Error saving %s to cache" % name, exc_info=True)
+
 class CharacterDescriptions(object):
 	"""
 	Represents a map of characters to one or more descriptions (examples) for that character.
@@ -70,10 +181,15 @@ class CharacterDescriptions(object):
 		@param locale: The characterDescriptions.dic file will be found by using this locale.
 		@type locale: string
 		"""
-		self._entries = {}
 		fileName=os.path.join('locale',locale,'characterDescriptions.dic')
 		if not os.path.isfile(fileName): 
 			raise LookupError(fileName)
+		cacheName = "characterDescriptions-%s" % locale
+		stamps = _getFileStamps([fileName])
+		self._entries = _loadCache(cacheName, stamps)
+		if self._entries is not None:
+			return
+		self._entries = {}
 		f = codecs.open(fileName,"r","utf_8_sig",errors="replace")
 		for line in f:
 			if line.isspace() or line.startswith('#'):
@@ -87,6 +203,7 @@ class CharacterDescriptions(object):
 				log.warning("can't parse line '%s'" % line)
 		log.debug("Loaded %d entries." % len(self._entries))
 		f.close()
+		_saveCache(cacheName, stamps, self._entries)
 
 	def getCharacterDescription(self, character):
 		"""
@@ -350,23 +467,99 @@ class SpeechSymbols(object):
 			fields.append("# %s" % symbol.displayName)
 		return u"\t".join(fields)
 
+def _getSpeechSymbolsFileNames(locale):
+	"""Get the names of the builtin and user symbol files for a locale.
+	@rtype: tuple of str
+	"""
+	return (os.path.join("locale", locale, "symbols.dic"),
+		os.path.join(globalVars.appArgs.configPath, "symbols-%s.dic" % locale))
+
 def _getSpeechSymbolsForLocale(locale):
+	builtinFileName, userFileName = _getSpeechSymbolsFileNames(locale)
 	builtin = SpeechSymbols()
 	try:
-		builtin.load(os.path.join("locale", locale, "symbols.dic"))
+		builtin.load(builtinFileName)
 	except IOError:
 		raise LookupError("No symbol information for locale %s" % locale)
 	user = SpeechSymbols()
 	try:
 		# Don't allow users to specify complex symbols
 		# because an error will cause the whole processor to fail.
-		user.load(os.path.join(globalVars.appArgs.configPath, "symbols-%s.dic" % locale),
-			allowComplexSymbols=False)
+		user.load(userFileName, allowComplexSymbols=False)
 	except IOError:
 		# An empty user SpeechSymbols is okay.
 		pass
 	return builtin, user
 
+class ProcessedTextCache(object):
+	"""A bounded, least recently used cache of processed text.
+	The cache is bounded by the total length of the text it holds (both the original and processed text),
+	rather than by the number of entries, so that a few long strings can't push out many short ones.
+	The number of hits and misses is tracked in L{hits} and L{misses}.
+	"""
+
+	def __init__(self, maxSize, maxTextLength):
+		"""Constructor.
+		@param maxSize: The maximum total length of text to hold.
+		@type maxSize: int
+		@param maxTextLength: Text longer than this is never cached.
+		@type maxTextLength: int
+		"""
+		self.maxSize = maxSize
+		self.maxTextLength = maxTextLength
+		self._entries = collections.OrderedDict()
+		self._size = 0
+		#: The number of lookups which were found in the cache.
+		self.hits = 0
+		#: The number of lookups which were not found in the cache.
+		self.misses = 0
+
+	def get(self, key, text):
+		"""Get the processed form of some text.
+		@param key: Anything else the processed text depends on.
+		@param text: The original text.
+		@type text: basestring
+		@return: The processed text or C{None} if it isn't cached.
+		@rtype: basestring
+		"""
+		try:
+			processed = self._entries.pop((key, text))
+		except KeyError:
+			self.misses += 1
+			return None
+		# Reinsert so that this becomes the most recently used entry.
+		self._entries[key, text] = processed
+		self.hits += 1
+		return processed
+
+	def set(self, key, text, processed):
+		"""Cache the processed form of some text.
+		@param key: Anything else the processed text depends on.
+		@param text: The original text.
+		@type text: basestring
+		@param processed: The processed text.
+		@type processed: basestring
+		"""
+		if len(text) > self.maxTextLength:
+			return
+		old = self._entries.pop((key, text), None)
+		if old is not None:
+			self._size -= len(text) + len(old)
+		self._entries[key, text] = processed
+		self._size += len(text) + len(processed)
+		while self._size > self.maxSize:
+			(oldKey, oldText), old = self._entries.popitem(last=False)
+			self._size -= len(oldText) + len(old)
+
+	def clear(self):
+		"""Remove all entries from the cache.
+		"""
+		self._entries.clear()
+		self._size = 0
+
+	def __len__(self):
+		return len(self._entries)
+
 class SpeechSymbolProcessor(object):
 	"""
 	Handles processing of symbol pronunciation for a locale.
@@ -375,6 +568,13 @@ class SpeechSymbolProcessor(object):
 
 	#: Caches symbol data for locales.
 	localeSymbols = LocaleDataMap(_getSpeechSymbolsForLocale)
+	#: The maximum total length of text held in the processed text cache for each locale.
+	#: @type: int
+	PROCESSED_TEXT_CACHE_SIZE = 100000
+	#: Text longer than this isn't held in the processed text cache,
+	#: as such text is rarely repeated.
+	#: @type: int
+	PROCESSED_TEXT_CACHE_MAX_TEXT_LENGTH = 1000
 
 	def __init__(self, locale):
 		"""Constructor.
@@ -382,7 +582,91 @@ class SpeechSymbolProcessor(object):
 		@type locale: str
 		"""
 		self.locale = locale
+		#: Caches the result of L{processText}, keyed by level and text.
+		#: Since a new processor is created whenever the data for a locale is invalidated,
+		#: this cache never holds output from stale symbol data.
+		#: @type: L{ProcessedTextCache}
+		self.textCache = ProcessedTextCache(self.PROCESSED_TEXT_CACHE_SIZE, self.PROCESSED_TEXT_CACHE_MAX_TEXT_LENGTH)
+
+		# Merging symbol data from all sources is expensive,
+		# so the parsed and merged data is cached on disk between runs.
+		# If the symbols for this locale have already been loaded, they might have been changed since they were saved,
+		# so the cache can't be used.
+		cacheName = "symbols-%s" % locale
+		fileNames = list(_getSpeechSymbolsFileNames(locale))
+		if locale != "en":
+			fileNames.append(_getSpeechSymbolsFileNames("en")[0])
+		stamps = _getFileStamps(fileNames)
+		cached = None
+		if not self.localeSymbols.isLocaleDataLoaded(locale):
+			cached = _loadCache(cacheName, stamps)
+		if cached:
+			builtin, user, self.builtinSources, self.computedSymbols, self._computedComplexSymbolsList, characters, multiChars = cached
+			if self.localeSymbols.setLocaleData(locale, (builtin, user))[1] is not user:
+				# The symbols for this locale were loaded in the meantime; e.g. by another thread.
+				# Use those so that updates apply to the same objects.
+				builtin, user = self._mergeSources(locale)
+				characters, multiChars = self._simpleCharacters, self._multiChars
+				cached = None
+			self.userSymbols = user
+			self.sources = [user] + self.builtinSources
+		else:
+			builtin, user = self._mergeSources(locale)
+			characters, multiChars = self._simpleCharacters, self._multiChars
+		self._simpleCharacters = characters
+		self._multiChars = multiChars
+		complexSymbolsList = self._computedComplexSymbolsList
+		# Make characters into a regexp character set.
+		characters = "[%s]" % re.escape("".join(characters))
+
+		# Build the regexp.
+		patterns = [
+			# Strip repeated spaces from the end of the line to stop them from being picked up by repeated.
+			r"(?P<rstripSpace>  +$)",
+			# Repeated characters: more than 3 repeats.
+			r"(?P<repeated>(?P<repTmp>%s)(?P=repTmp){3,})" % characters
+		]
+		# Complex symbols.
+		# Each complex symbol has its own named group so we know which symbol matched.
+		patterns.extend(
+			u"(?P<c{index}>{pattern})".format(index=index, pattern=symbol.pattern)
+			for index, symbol in enumerate(complexSymbolsList))
+		try:
+			# Everything except simple symbols, used to find the parts of the text which need the full regexp.
+			self._complexRegexp = re.compile("|".join(patterns), re.UNICODE)
+		except re.error as e:
+			log.error("Invalid complex symbol regular expression in locale %s: %s" % (locale, e))
+			raise LookupError
+		if multiChars:
+			self._multiCharsRegexp = re.compile("|".join(re.escape(identifier) for identifier in multiChars), re.UNICODE)
+		else:
+			self._multiCharsRegexp = None
+		#: Maps symbol levels to the output for simple symbols at that level; see L{_getSimpleSymbolTables}.
+		self._simpleSymbolTables = {}
+		# Simple symbols.
+		# These are all handled in one named group.
+		# Because the symbols are just text, we know which symbol matched just by looking at the matched text.
+		patterns.append(ur"(?P<simple>{multiChars}|{singleChars})".format(
+			multiChars="|".join(re.escape(identifier) for identifier in multiChars),
+			singleChars=characters
+		))
+		pattern = "|".join(patterns)
+		try:
+			self._regexp = re.compile(pattern, re.UNICODE)
+		except re.error as e:
+			log.error("Invalid complex symbol regular expression in locale %s: %s" % (locale, e))
+			raise LookupError
+		if not cached:
+			# Only cache the data once we know it produces a valid regexp.
+			_saveCache(cacheName, stamps, (builtin, user, self.builtinSources, self.computedSymbols, complexSymbolsList, self._simpleCharacters, multiChars))
 
+	def _mergeSources(self, locale):
+		"""Merge symbol data from all sources for a locale.
+		This sets L{sources}, L{builtinSources}, L{userSymbols} and L{computedSymbols},
+		as well as the complex symbols, single characters and multi-character symbols used to build the regexp.
+		@return: The builtin and user symbols for the locale.
+		@rtype: tuple of L{SpeechSymbols}
+		"""
 		# We need to merge symbol data from several sources.
 		sources = self.sources = []
 		builtin, user = self.localeSymbols.fetchLocaleData(locale,fallback=False)
@@ -446,7 +730,7 @@ class SpeechSymbolProcessor(object):
 			if symbol.replacement is None:
 				# Symbols without a replacement specified are useless.
 				log.warning(u"Replacement not defined in locale {locale} for symbol: {symbol}".format(
-					symbol=symbol.identifier, locale=self.locale))
+					symbol=symbol.identifier, locale=locale))
 				del symbols[symbol.identifier]
 				try:
 					complexSymbolsList.remove(symbol)
@@ -460,36 +744,11 @@ class SpeechSymbolProcessor(object):
 			if symbol.displayName is None:
 				symbol.displayName = symbol.identifier
 
-		# Make characters into a regexp character set.
-		characters = "[%s]" % re.escape("".join(characters))
+		self._simpleCharacters = characters
 		# The simple symbols must be ordered longest first so that the longer symbols will match.
 		multiChars.sort(key=lambda identifier: len(identifier), reverse=True)
-
-		# Build the regexp.
-		patterns = [
-			# Strip repeated spaces from the end of the line to stop them from being picked up by repeated.
-			r"(?P<rstripSpace>  +$)",
-			# Repeated characters: more than 3 repeats.
-			r"(?P<repeated>(?P<repTmp>%s)(?P=repTmp){3,})" % characters
-		]
-		# Complex symbols.
-		# Each complex symbol has its own named group so we know which symbol matched.
-		patterns.extend(
-			u"(?P<c{index}>{pattern})".format(index=index, pattern=symbol.pattern)
-			for index, symbol in enumerate(complexSymbolsList))
-		# Simple symbols.
-		# These are all handled in one named group.
-		# Because the symbols are just text, we know which symbol matched just by looking at the matched text.
-		patterns.append(ur"(?P<simple>{multiChars}|{singleChars})".format(
-			multiChars="|".join(re.escape(identifier) for identifier in multiChars),
-			singleChars=characters
-		))
-		pattern = "|".join(patterns)
-		try:
-			self._regexp = re.compile(pattern, re.UNICODE)
-		except re.error as e:
-			log.error("Invalid complex symbol regular expression in locale %s: %s" % (locale, e))
-			raise LookupError
+		self._multiChars = multiChars
+		return builtin, user
 
 	def _regexpRepl(self, m):
 		group = m.lastgroup
@@ -525,9 +784,106 @@ class SpeechSymbolProcessor(object):
 			else:
 				return suffix
 
+	def _getSimpleSymbolTables(self, level):
+		"""Get the output for each simple symbol at a given level.
+		This is exactly what L{_regexpRepl} would return for the symbol at this level,
+		but can be used without calling back into Python for each match.
+		@return: A translation table for single character symbols suitable for C{unicode.translate}
+			and a dict mapping multi-character symbols to their output,
+			or C{None} if simple symbols can't be handled this way.
+		@rtype: tuple or NoneType
+		"""
+		try:
+			return self._simpleSymbolTables[level]
+		except KeyError:
+			pass
+		charTable = {}
+		multiCharTable = {}
+		try:
+			for identifier in self._simpleCharacters:
+				charTable[ord(identifier)] = self._getSimpleSymbolOutput(identifier, level)
+			for identifier in self._multiChars:
+				multiCharTable[identifier] = self._getSimpleSymbolOutput(identifier, level)
+		except KeyError:
+			# A symbol was dropped from computedSymbols;
+			# e.g. because it has no replacement.
+			tables = None
+		else:
+			tables = (charTable, multiCharTable)
+		self._simpleSymbolTables[level] = tables
+		return tables
+
+	def _getSimpleSymbolOutput(self, identifier, level):
+		symbol = self.computedSymbols[identifier]
+		if symbol.preserve == SYMPRES_ALWAYS or (symbol.preserve == SYMPRES_NOREP and level < symbol.level):
+			suffix = identifier
+		else:
+			suffix = u" "
+		if level >= symbol.level and symbol.replacement:
+			return u" {repl}{suffix}".format(repl=symbol.replacement, suffix=suffix)
+		else:
+			return suffix
+
+	def _processTextFast(self, text, tables):
+		"""Process text, only calling back into Python for matches which aren't simple symbols.
+		This produces exactly the same output as substituting L{_regexp}.
+		The text between matches of L{_complexRegexp} can only contain simple symbols,
+		so it is handled with C{unicode.translate} and a lookup for each multi-character symbol.
+		@return: The processed text or C{None} if the text can't be processed this way.
+		@rtype: unicode
+		"""
+		charTable, multiCharTable = tables
+		complexSearch = self._complexRegexp.search
+		multiCharsSearch = self._multiCharsRegexp.search if self._multiCharsRegexp else None
+		textLen = len(text)
+		out = []
+		pos = 0
+		complexMatch = multiCharsMatch = None
+		while True:
+			# Find the next complex match and the next multi-character symbol, reusing previous searches if they're still ahead of us.
+			if complexMatch is not None and complexMatch.start() < pos:
+				complexMatch = None
+			if complexMatch is None and pos <= textLen:
+				complexMatch = complexSearch(text, pos)
+				if complexMatch and complexMatch.start() == complexMatch.end():
+					# Empty matches are handled specially by re.sub.
+					return None
+			end = complexMatch.start() if complexMatch else textLen
+			while multiCharsSearch and pos < end:
+				if multiCharsMatch is None or multiCharsMatch.start() < pos:
+					multiCharsMatch = multiCharsSearch(text, pos)
+					if not multiCharsMatch:
+						multiCharsSearch = None
+						break
+				if multiCharsMatch.start() >= end:
+					break
+				out.append(text[pos:multiCharsMatch.start()].translate(charTable))
+				out.append(multiCharTable[multiCharsMatch.group()])
+				pos = multiCharsMatch.end()
+			if pos > end:
+				# A multi-character symbol overlapped the complex match, so the complex match never happens.
+				continue
+			out.append(text[pos:end].translate(charTable))
+			if not complexMatch:
+				break
+			out.append(self._regexpRepl(complexMatch))
+			pos = complexMatch.end()
+		return u"".join(out)
+
 	def processText(self, text, level):
+		processed = self.textCache.get(level, text)
+		if processed is not None:
+			return processed
 		self._level = level
-		return self._regexp.sub(self._regexpRepl, text)
+		processed = None
+		if isinstance(text, unicode):
+			tables = self._getSimpleSymbolTables(level)
+			if tables:
+				processed = self._processTextFast(text, tables)
+		if processed is None:
+			processed = self._regexp.sub(self._regexpRepl, text)
+		self.textCache.set(level, text, processed)
+		return processed
 
 	def updateSymbol(self, newSymbol):
 		"""Update information for a symbol if it has changed.
@@ -572,6 +928,7 @@ class SpeechSymbolProcessor(object):
 
 		# Do this in case the symbol wasn't in userSymbols before.
 		self.userSymbols.symbols[identifier] = userSymbol
+		self.textCache.clear()
 		return True
 
 	def deleteSymbol(self, symbol):
@@ -584,7 +941,8 @@ class SpeechSymbolProcessor(object):
 		try:
 			del self.userSymbols.symbols[symbol.identifier]
 		except KeyError:
-			pass
+			return
+		self.textCache.clear()
 
 	def isBuiltin(self, symbolIdentifier):
 		"""Determine whether a symbol is built in.
@@ -598,6 +956,51 @@ class SpeechSymbolProcessor(object):
 
 _localeSpeechSymbolProcessors = LocaleDataMap(SpeechSymbolProcessor)
 
+class _SpeechSymbolProcessorPrewarmer(object):
+	"""Creates speech symbol processors for locales likely to be needed soon in a background thread.
+	Creating a processor for a locale which hasn't been used before is expensive
+	and would otherwise happen on the main thread the first time text in that locale is spoken.
+	"""
+
+	def __init__(self):
+		self._queue = Queue.Queue()
+		self._thread = None
+
+	def prewarm(self, locales):
+		"""Request that processors be created for the given locales.
+		@param locales: The locales in question.
+		@type locales: iterable of str
+		"""
+		locales = [locale for locale in locales if locale and not _localeSpeechSymbolProcessors.isLocaleDataLoaded(locale)]
+		if not locales:
+			return
+		for locale in locales:
+			self._queue.put(locale)
+		if not self._thread:
+			thread = self._thread = threading.Thread(target=self._run, name="SpeechSymbolProcessorPrewarmer")
+			thread.daemon = True
+			thread.start()
+
+	def _run(self):
+		while True:
+			locale = self._queue.get()
+			try:
+				if not _localeSpeechSymbolProcessors.prefetchLocaleData(locale) and "_" in locale:
+					# processSpeechSymbols falls back to the language without the country.
+					_localeSpeechSymbolProcessors.prefetchLocaleData(locale.split("_")[0])
+			except:
+				log.error("Error creating speech symbol processor for locale %s" % locale, exc_info=True)
+
+_prewarmer = _SpeechSymbolProcessorPrewarmer()
+
+def prewarmSpeechSymbolProcessors(locales):
+	"""Create speech symbol processors in the background for locales which are likely to be needed soon.
+	English is always included, as it is the fallback for locales with no symbol information.
+	@param locales: The locales in question.
+	@type locales: iterable of str
+	"""
+	_prewarmer.prewarm(itertools.chain(locales, ("en",)))
+
 def processSpeechSymbols(locale, text, level):
 	"""Process some text, converting symbols according to desired pronunciation.
 	@param locale: The locale of the text.
@@ -19,7 +19,7 @@ import contextlib
 from copy import deepcopy
 from collections import OrderedDict
 from configobj import ConfigObj, ConfigObjError
-from validate import Validator
+from validate import Validator, ValidateError
 from logHandler import log, levelNames
 from logging import DEBUG
 import shlobj
@@ -295,6 +295,13 @@ class ConfigManager(object):
 		self.profileTriggersEnabled = True
 		self.validator = Validator()
 		self.rootSection = None
+		#: The profiles which were active when L{rootSection} was last updated.
+		self._rootSectionProfiles = []
+		#: Incremented whenever the configuration changes;
+		#: i.e. when a setting is written, a section's spec is replaced or the active profiles change.
+		#: @type: int
+		self.version = 0
+		self._snapshot = None
 		self._shouldHandleProfileSwitch = True
 		self._pendingHandleProfileSwitch = False
 		self._suspendedTriggers = None
@@ -310,17 +317,36 @@ class ConfigManager(object):
 			self._pendingHandleProfileSwitch = True
 			return
 		init = self.rootSection is None
-		# Reset the cache.
-		self.rootSection = AggregatedSection(self, (), self.spec, self.profiles)
 		if init:
+			# Build the cache from scratch.
+			self.rootSection = AggregatedSection(self, (), self.spec, self.profiles)
+			self._rootSectionProfiles = list(self.profiles)
+			self._handleChange()
 			# We're still initialising, so don't notify anyone about this change.
 			return
-		import synthDriverHandler
-		synthDriverHandler.handleConfigProfileSwitch()
-		import braille
-		braille.handler.handleConfigProfileSwitch()
-		import audioDucking
-		audioDucking.handleConfigProfileSwitch()
+		# Profiles below the first difference between the old and new stacks are unaffected,
+		# so only settings in the profiles above that point can have changed.
+		oldProfiles = self._rootSectionProfiles
+		common = 0
+		for old, new in itertools.izip(oldProfiles, self.profiles):
+			if old is not new:
+				break
+			common += 1
+		changedProfiles = oldProfiles[common:] + self.profiles[common:]
+		self._rootSectionProfiles = list(self.profiles)
+		changedKeys = self.rootSection._handleProfileSwitch(self.profiles, changedProfiles)
+		if not changedKeys:
+			return
+		self._handleChange()
+		if "speech" in changedKeys:
+			import synthDriverHandler
+			synthDriverHandler.handleConfigProfileSwitch()
+		if "braille" in changedKeys:
+			import braille
+			braille.handler.handleConfigProfileSwitch()
+		if "audio" in changedKeys:
+			import audioDucking
+			audioDucking.handleConfigProfileSwitch()
 
 	def _initBaseConf(self, factoryDefaults=False):
 		fn = os.path.join(globalVars.appArgs.configPath, "nvda.ini")
@@ -443,6 +469,28 @@ class ConfigManager(object):
 			self.profiles.append(profile)
 		self._handleProfileSwitch()
 
+	def _handleChange(self):
+		"""Called whenever the configuration changes so that snapshots are rebuilt.
+		"""
+		self.version += 1
+		self._snapshot = None
+
+	def getSnapshot(self):
+		"""Get an immutable snapshot of the current configuration.
+		Reading from a snapshot avoids the profile walk and validation done by L{AggregatedSection},
+		so code which reads many settings for every event should fetch a snapshot once and read from that.
+		The snapshot is only rebuilt when the configuration has changed since the last call;
+		see L{version}.
+		The L{BASE_ONLY_SECTIONS} are not included,
+		as they are written directly in the base configuration and thus can't be tracked.
+		@return: The snapshot.
+		@rtype: L{ConfigSnapshot}
+		"""
+		snapshot = self._snapshot
+		if snapshot is None:
+			snapshot = self._snapshot = ConfigSnapshot.fromSection(self.rootSection, self.version, exclude=self.BASE_ONLY_SECTIONS)
+		return snapshot
+
 	def _markWriteProfileDirty(self):
 		if len(self.profiles) == 1:
 			# There's nothing other than the base config, which is always saved anyway.
@@ -737,6 +785,81 @@ class ConfigManager(object):
 			spec = spec[nextKey]
 		return conf.validator._parse_with_caching(spec)[2][validationParameter]
 
+class ConfigSnapshot(object):
+	"""An immutable copy of a section of the configuration at a point in time.
+	Settings and subsections are available as attributes; e.g. C{snap.speech.symbolLevel}.
+	For keys which aren't valid identifiers, item access can be used as well.
+	Subsections are also L{ConfigSnapshot}s.
+	List values are converted to tuples so that they can't be modified.
+	Snapshots are usually obtained using L{ConfigManager.getSnapshot}.
+	"""
+	# Settings are stored in the instance dict so that attribute access doesn't need any Python code.
+	__slots__ = ("__dict__", "version")
+
+	def __init__(self, values, version):
+		"""Constructor.
+		@param values: The settings and subsections in this section.
+		@type values: dict
+		@param version: The L{ConfigManager.version} at which this snapshot was taken.
+		@type version: int
+		"""
+		object.__setattr__(self, "__dict__", values)
+		#: The L{ConfigManager.version} at which this snapshot was taken.
+		#: @type: int
+		object.__setattr__(self, "version", version)
+
+	@classmethod
+	def fromSection(cls, section, version, exclude=()):
+		"""Create a snapshot of an aggregated section and all of its subsections.
+		@param section: The section to copy.
+		@type section: L{AggregatedSection}
+		@param version: The L{ConfigManager.version} of the configuration.
+		@type version: int
+		@param exclude: Keys in this section which should not be included.
+		@type exclude: set
+		@rtype: L{ConfigSnapshot}
+		"""
+		values = {}
+		for key in section._iterKeys():
+			if key in exclude:
+				continue
+			try:
+				val = section[key]
+			except KeyError:
+				continue
+			except ValidateError:
+				# Leave out invalid settings so that reading them fails,
+				# just as it would when reading them from the configuration.
+				log.debugWarning("Invalid setting %s" % "/".join(section.path + (key,)), exc_info=True)
+				continue
+			if isinstance(val, AggregatedSection):
+				val = cls.fromSection(val, version)
+			elif isinstance(val, list):
+				val = tuple(val)
+			values[key] = val
+		return cls(values, version)
+
+	def __setattr__(self, name, val):
+		raise AttributeError("Configuration snapshots can't be modified")
+
+	def __delattr__(self, name):
+		raise AttributeError("Configuration snapshots can't be modified")
+
+	def __getitem__(self, key):
+		return self.__dict__[key]
+
+	def __contains__(self, key):
+		return key in self.__dict__
+
+	def get(self, key, default=None):
+		return self.__dict__.get(key, default)
+
+	def iteritems(self):
+		return self.__dict__.iteritems()
+
+	def __repr__(self):
+		return "<ConfigSnapshot version %d: %r>" % (self.version, self.__dict__)
+
 class AggregatedSection(object):
 	"""A view of a section of configuration which aggregates settings from all active profiles.
 	"""
@@ -835,6 +958,44 @@ class AggregatedSection(object):
 				return True
 		return False
 
+	def _handleProfileSwitch(self, profiles, changedProfiles):
+		"""Update this section and its cached subsections after the active profiles have changed.
+		Only cached items which are set in one of the changed profiles are discarded,
+		as the values of all other items can't have changed.
+		@param profiles: The relevant section in all of the now active profiles.
+		@type profiles: list
+		@param changedProfiles: The relevant section in all profiles which were activated or deactivated.
+		@type changedProfiles: list
+		@return: The keys in this section which might have changed.
+		@rtype: set
+		"""
+		self.profiles = profiles
+		changedKeys = set()
+		for profile in changedProfiles:
+			if profile:
+				changedKeys.update(profile)
+		for key, val in self._cache.items():
+			if not isinstance(val, AggregatedSection):
+				if key in changedKeys:
+					del self._cache[key]
+				continue
+			subProfiles = []
+			for profile in profiles:
+				subProfile = profile.get(key) if profile else None
+				if subProfile is not None and not isinstance(subProfile, dict):
+					# This is now a setting rather than a section.
+					subProfiles = None
+					break
+				subProfiles.append(subProfile)
+			if subProfiles is None:
+				del self._cache[key]
+				continue
+			# Cached subsections must always be updated, since they have a profile list of their own.
+			changedSubProfiles = [profile[key] for profile in changedProfiles
+				if profile and isinstance(profile.get(key), dict)]
+			val._handleProfileSwitch(subProfiles, changedSubProfiles)
+		return changedKeys
+
 	def _cacheLeaf(self, key, spec, val):
 		if spec:
 			# Validate and convert the value.
@@ -842,13 +1003,16 @@ class AggregatedSection(object):
 		self._cache[key] = val
 		return val
 
-	def iteritems(self):
+	def _iterKeys(self):
+		"""Iterate through all keys which might exist in this section.
+		This includes keys in the spec which have no default,
+		so fetching a key might still raise C{KeyError}.
+		"""
 		keys = set()
 		# Start with the cached items.
-		for key, val in self._cache.iteritems():
+		for key in self._cache:
 			keys.add(key)
-			if val is not KeyError:
-				yield key, val
+			yield key
 		# Walk through the profiles and spec looking for items not yet cached.
 		for profile in itertools.chain(reversed(self.profiles), (self._spec,)):
 			if not profile:
@@ -857,12 +1021,16 @@ class AggregatedSection(object):
 				if key in keys:
 					continue
 				keys.add(key)
-				# Use __getitem__ so caching, AggregatedSections, etc. are handled.
-				try:
-					yield key, self[key]
-				except KeyError:
-					# This could happen if the item is in the spec but there's no default.
-					pass
+				yield key
+
+	def iteritems(self):
+		for key in self._iterKeys():
+			# Use __getitem__ so caching, AggregatedSections, etc. are handled.
+			try:
+				yield key, self[key]
+			except KeyError:
+				# This could happen if the item is in the spec but there's no default.
+				pass
 
 	def copy(self):
 		return dict(self.iteritems())
@@ -878,6 +1046,7 @@ class AggregatedSection(object):
 			updateSect = self._getUpdateSection()
 			updateSect[key] = val
 			self.manager._markWriteProfileDirty()
+			self.manager._handleChange()
 			# ConfigObj will have mutated this into a configobj.Section.
 			val = updateSect[key]
 			cache = self._cache.get(key)
@@ -912,6 +1081,7 @@ class AggregatedSection(object):
 		self._getUpdateSection()[key] = val
 		self.manager._markWriteProfileDirty()
 		self._cache[key] = val
+		self.manager._handleChange()
 
 	def _getUpdateSection(self):
 		profile = self.profiles[-1]
@@ -943,6 +1113,7 @@ class AggregatedSection(object):
 		# Clear it and replace the content so it remains linked to the main spec.
 		self._spec.clear()
 		self._spec.update(val)
+		self.manager._handleChange()
 
 class ProfileTrigger(object):
 	"""A trigger for automatic activation/deactivation of a configuration profile.
@@ -25,6 +25,10 @@ schemaVersion = integer(min=0, default={latestSchemaVersion})
 	#possible log levels are DEBUG, IO, DEBUGWARNING, INFO
 	loggingLevel = string(default="INFO")
 	showWelcomeDialogAtStartup = boolean(default=true)
+	# The maximum time in milliseconds to spend running queued functions in each core pump, 0 for no limit.
+	queueTimeBudget = integer(default=100,min=0)
+	# Whether a queued event may absorb later events of the same type for the same object; see eventHandler.COALESCE_POLICY.
+	coalesceEvents = boolean(default=true)
 
 # Speech settings
 [speech]
@@ -61,6 +65,8 @@ schemaVersion = integer(min=0, default={latestSchemaVersion})
 	tetherTo = string(default="focus")
 	readByParagraph = boolean(default=false)
 	wordWrap = boolean(default=true)
+	# Writes to the display within this many milliseconds of the last are combined into one.
+	writeCoalesceInterval = integer(default=0,min=0,max=500)
 
 	# Braille display driver settings
 	[[__many__]]
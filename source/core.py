@@ -344,6 +344,7 @@ This initializes all modules such as audio, IAccessible, keyboard, mouse, and GU
 	queueHandler.queueFunction(queueHandler.eventQueue, _setInitialFocus)
 	import watchdog
 	import baseObject
+	import pumpProfiler
 
 	# Doing this here is a bit ugly, but we don't want these modules imported
 	# at module level, including wx.
@@ -354,17 +355,32 @@ This initializes all modules such as audio, IAccessible, keyboard, mouse, and GU
 			global _isPumpPending
 			_isPumpPending = False
 			watchdog.alive()
+			pumpProfiler.startCycle()
 			try:
 				if touchHandler.handler:
 					touchHandler.handler.pump()
+				pumpProfiler.mark("touchHandler")
 				JABHandler.pumpAll()
+				pumpProfiler.mark("JABHandler")
 				IAccessibleHandler.pumpAll()
+				pumpProfiler.mark("IAccessibleHandler")
 				queueHandler.pumpAll()
+				pumpProfiler.mark("queueHandler")
+				if queueHandler.eventQueue.empty():
+					speech.prewarmSeenLanguages()
 				mouseHandler.pumpAll()
+				pumpProfiler.mark("mouseHandler")
 				braille.pumpAll()
+				pumpProfiler.mark("braille")
 			except:
 				log.exception("errors in this core pump cycle")
-			baseObject.AutoPropertyObject.invalidateCaches()
+			try:
+				baseObject.AutoPropertyObject.invalidateCaches()
+				pumpProfiler.mark("invalidateCaches")
+			except:
+				log.exception("error invalidating caches")
+			finally:
+				pumpProfiler.endCycle()
 			watchdog.asleep()
 			if _isPumpPending and not _pump.IsRunning():
 				# #3803: A pump was requested, but the timer was ignored by a modal loop
@@ -16,6 +16,7 @@ from logHandler import log
 import globalPluginHandler
 import config
 import winUser
+import pumpProfiler
 
 #Some dicts to store event counts by name and or obj
 _pendingEventCountsByName={}
@@ -27,22 +28,73 @@ _pendingEventCountsLock=threading.RLock()
 #: the last object queued for a gainFocus event. Useful for code running outside NVDA's core queue 
 lastQueuedFocusObject=None
 
+#: Whether a new event should be coalesced with an event of the same type for the same object which is still queued.
+#: If so, only the queued event is executed, with the keyword arguments of the latest event.
+#: This is only safe for events whose handlers report the current state of the object
+#: rather than anything specific to the event.
+#: Event types not listed here are never coalesced.
+#: Coalescing can be turned off entirely with the general coalesceEvents configuration setting,
+#: and objects and app modules can exclude events with their uncoalescedEvents attribute.
+#: @type: dict
+COALESCE_POLICY={
+	"gainFocus":False,
+	"nameChange":True,
+	"valueChange":True,
+	"descriptionChange":True,
+	"locationChange":True,
+}
+#: Maps (eventName,obj) to the keyword arguments of events which are queued and can be coalesced.
+_pendingCoalescableEvents={}
+#: The number of queued events which have been executed.
+processedEventCount=0
+#: The number of events which have been dropped because they were coalesced with a queued event.
+coalescedEventCount=0
+
+def _shouldCoalesceEvent(eventName,obj):
+	"""Whether an event may be coalesced with an event of the same type for the same object which is still queued.
+	@see: L{COALESCE_POLICY}
+	"""
+	if not COALESCE_POLICY.get(eventName) or not config.conf["general"]["coalesceEvents"]:
+		return False
+	if eventName in getattr(obj,"uncoalescedEvents",()):
+		return False
+	appModule=getattr(obj,"appModule",None)
+	if appModule and eventName in appModule.uncoalescedEvents:
+		return False
+	return True
+
 def queueEvent(eventName,obj,**kwargs):
 	"""Queues an NVDA event to be executed.
 	@param eventName: the name of the event type (e.g. 'gainFocus', 'nameChange')
 	@type eventName: string
 	"""
-	global lastQueuedFocusObject
+	global lastQueuedFocusObject, coalescedEventCount
 	if eventName=="gainFocus":
 		lastQueuedFocusObject=obj
+	# Check this before taking the lock, as it might need to fetch the app module.
+	coalesce=_shouldCoalesceEvent(eventName,obj)
 	with _pendingEventCountsLock:
+		if coalesce:
+			pendingKwargs=_pendingCoalescableEvents.get((eventName,obj))
+			if pendingKwargs is not None:
+				# The queued event will be executed with these arguments instead.
+				pendingKwargs.clear()
+				pendingKwargs.update(kwargs)
+				coalescedEventCount+=1
+				return
+			_pendingCoalescableEvents[(eventName,obj)]=kwargs
 		_pendingEventCountsByName[eventName]=_pendingEventCountsByName.get(eventName,0)+1
 		_pendingEventCountsByObj[obj]=_pendingEventCountsByObj.get(obj,0)+1
 		_pendingEventCountsByNameAndObj[(eventName,obj)]=_pendingEventCountsByNameAndObj.get((eventName,obj),0)+1
 	queueHandler.queueFunction(queueHandler.eventQueue,_queueEventCallback,eventName,obj,kwargs)
 
 def _queueEventCallback(eventName,obj,kwargs):
+	global processedEventCount
 	with _pendingEventCountsLock:
+		processedEventCount+=1
+		if _pendingCoalescableEvents.get((eventName,obj)) is kwargs:
+			# Any further events of this type for this object must be queued separately.
+			del _pendingCoalescableEvents[(eventName,obj)]
 		curCount=_pendingEventCountsByName.get(eventName,0)
 		if curCount>1:
 			_pendingEventCountsByName[eventName]=(curCount-1)
@@ -78,6 +130,55 @@ def isPendingEvents(eventName=None,obj=None):
 	elif eventName and obj:
 		return (eventName,obj) in _pendingEventCountsByNameAndObj
 
+def getCoalescingMetrics():
+	"""Get the number of queued events which have been executed and the number dropped because they were coalesced.
+	@rtype: dict
+	"""
+	return {
+		"processed":processedEventCount,
+		"coalesced":coalescedEventCount,
+	}
+
+#: Caches the event handler found on a class, keyed by (funcName,cls).
+#: Values are (func,isDescriptor), or C{None} if the class has no handler.
+_eventHandlerCache={}
+
+def _getEventHandler(obj,funcName):
+	"""Get the handler for an event on an object (a plugin, app module, tree interceptor or NVDAObject).
+	The handler found on the class of the object, or its absence, is cached
+	so that it is a dict lookup for subsequent events.
+	Handlers set on the instance itself are not cached and take precedence.
+	@return: The bound handler, or C{None} if there isn't one.
+	"""
+	if funcName in obj.__dict__:
+		return getattr(obj,funcName)
+	cls=obj.__class__
+	try:
+		entry=_eventHandlerCache[(funcName,cls)]
+	except KeyError:
+		entry=None
+		for base in cls.__mro__:
+			try:
+				func=base.__dict__[funcName]
+			except KeyError:
+				continue
+			entry=(func,hasattr(func,"__get__"))
+			break
+		_eventHandlerCache[(funcName,cls)]=entry
+	if not entry:
+		return None
+	func,isDescriptor=entry
+	if isDescriptor:
+		return func.__get__(obj,cls)
+	return func
+
+def clearEventHandlerCache():
+	"""Clear the cache of event handlers.
+	This should be called when plugins are reloaded or unloaded so that their classes can be garbage collected,
+	and by code which adds, replaces or removes event handlers on existing classes.
+	"""
+	_eventHandlerCache.clear()
+
 class _EventExecuter(object):
 	"""Facilitates execution of a chain of event functions.
 	L{gen} generates the event functions and positional arguments.
@@ -102,26 +203,26 @@ class _EventExecuter(object):
 
 		# Global plugin level.
 		for plugin in globalPluginHandler.runningPlugins:
-			func = getattr(plugin, funcName, None)
+			func = _getEventHandler(plugin, funcName)
 			if func:
 				yield func, (obj, self.next)
 
 		# App module level.
 		app = obj.appModule
 		if app:
-			func = getattr(app, funcName, None)
+			func = _getEventHandler(app, funcName)
 			if func:
 				yield func, (obj, self.next)
 
 		# Tree interceptor level.
 		treeInterceptor = obj.treeInterceptor
 		if treeInterceptor:
-			func = getattr(treeInterceptor, funcName, None)
+			func = _getEventHandler(treeInterceptor, funcName)
 			if func and (getattr(func,'ignoreIsReady',False) or treeInterceptor.isReady):
 				yield func, (obj, self.next)
 
 		# NVDAObject level.
-		func = getattr(obj, funcName, None)
+		func = _getEventHandler(obj, funcName)
 		if func:
 			yield func, ()
 
@@ -133,6 +234,7 @@ def executeEvent(eventName,obj,**kwargs):
 	@type obj: L{NVDAObjects.NVDAObject}
 	@param kwargs: Additional event parameters as keyword arguments.
 	"""
+	startTime=pumpProfiler.startTiming()
 	try:
 		sleepMode=obj.sleepMode
 		if eventName=="gainFocus" and not doPreGainFocus(obj,sleepMode=sleepMode):
@@ -143,6 +245,8 @@ def executeEvent(eventName,obj,**kwargs):
 			_EventExecuter(eventName,obj,kwargs)
 	except:
 		log.exception("error executing event: %s on %s with extra args of %s"%(eventName,obj,kwargs))
+	finally:
+		pumpProfiler.recordEvent(eventName,startTime)
 
 def doPreGainFocus(obj,sleepMode=False):
 	oldForeground=api.getForegroundObject()
@@ -10,6 +10,7 @@ import config
 import baseObject
 from logHandler import log
 import globalPlugins
+import eventHandler
 
 #: All currently running global plugins.
 runningPlugins = set()
@@ -51,6 +52,11 @@ def reloadGlobalPlugins():
 	for mod in mods:
 		del sys.modules[mod]
 	import globalPlugins
+	eventHandler.clearEventHandlerCache()
+	# Import late to avoid circular import.
+	import inputCore
+	if inputCore.manager:
+		inputCore.manager.invalidateGlobalMapScriptsIndex()
 	initialize()
 
 class GlobalPlugin(baseObject.ScriptableObject):
@@ -8,6 +8,9 @@
 See the L{Serial} and L{Hid} classes.
 Braille display drivers must be thread-safe to use this, as it utilises a background thread.
 See L{braille.BrailleDisplayDriver.isThreadSafe}.
+Overlapped reads complete via asynchronous procedure calls,
+so the background thread must be run by L{ioExecutor.ApcExecutor}.
+For an in-memory transport which works with any executor, see L{ioExecutor.LoopbackIo}.
 """
 
 import threading
@@ -112,6 +115,10 @@ class IoBase(object):
 			return
 		elif error != 0:
 			raise ctypes.WinError(error)
+		if bytes == 0:
+			# A chunked read (see L{Serial}) can complete without any data.
+			self._asyncRead()
+			return
 		self._notifyReceive(self._readBuf[:bytes])
 		self._recvEvt.set()
 		self._asyncRead()
@@ -136,12 +143,21 @@ class Serial(IoBase):
 	def __init__(self, *args, **kwargs):
 		"""Constructor.
 		Pass the arguments you would normally pass to L{serial.Serial}.
-		There is also one additional keyword argument.
+		There are also some additional keyword arguments.
 		@param onReceive: A callable taking a byte of received data as its only argument.
 			This callable can then call C{read} to get additional data if desired.
+			If C{readChunkSize} is specified, it is instead called with whatever data is available,
+			up to C{readChunkSize} bytes.
 		@type onReceive: callable(str)
+		@param readChunkSize: If specified, read whatever data is available (up to this many bytes) at once
+			rather than a byte at a time.
+			This greatly reduces the number of reads and callbacks for devices which send lots of data,
+			but C{onReceive} must then be able to handle data which contains partial or multiple packets;
+			see L{brailleDisplayDrivers._packets.EscapedFrameParser}.
+		@type readChunkSize: int
 		"""
 		onReceive = kwargs.pop("onReceive")
+		self._readChunkSize = kwargs.pop("readChunkSize", None)
 		self._ser = None
 		self.port = args[0] if len(args) >= 1 else kwargs["port"]
 		if _isDebug():
@@ -156,7 +172,8 @@ class Serial(IoBase):
 		# We don't want a timeout while we're waiting for data.
 		self._setTimeout(None)
 		self.inWaiting = self._ser.inWaiting
-		super(Serial, self).__init__(self._ser.hComPort, onReceive)
+		super(Serial, self).__init__(self._ser.hComPort, onReceive,
+			onReceiveSize=self._readChunkSize or 1)
 
 	def read(self, size=1):
 		data = self._ser.read(size)
@@ -187,16 +204,21 @@ class Serial(IoBase):
 		# Therefore, manually set the timeouts using the Win32 API.
 		# Adapted from pyserial 3.1.1.
 		timeouts = COMMTIMEOUTS()
-		if timeout is not None:
+		if timeout is None and self._readChunkSize:
+			# Wait for at least one byte, then return whatever is available immediately.
+			timeouts.ReadIntervalTimeout = MAXDWORD
+			timeouts.ReadTotalTimeoutMultiplier = MAXDWORD
+			timeouts.ReadTotalTimeoutConstant = MAXDWORD - 1
+		elif timeout is not None:
 			if timeout == 0:
-				timeouts.ReadIntervalTimeout = win32.MAXDWORD
+				timeouts.ReadIntervalTimeout = MAXDWORD
 			else:
 				timeouts.ReadTotalTimeoutConstant = max(int(timeout * 1000), 1)
 		if timeout != 0 and self._ser._interCharTimeout is not None:
 			timeouts.ReadIntervalTimeout = max(int(self._ser._interCharTimeout * 1000), 1)
 		if self._ser._writeTimeout is not None:
 			if self._ser._writeTimeout == 0:
-				timeouts.WriteTotalTimeoutConstant = win32.MAXDWORD
+				timeouts.WriteTotalTimeoutConstant = MAXDWORD
 			else:
 				timeouts.WriteTotalTimeoutConstant = max(int(self._ser._writeTimeout * 1000), 1)
 		SetCommTimeouts(self._ser.hComPort, ctypes.byref(timeouts))
@@ -186,6 +186,9 @@ class GlobalGestureMap(object):
 		@type entries: mapping of str to mapping
 		"""
 		self._map = {}
+		#: Incremented whenever this map changes, so that users can tell when to discard information derived from it.
+		#: @type: int
+		self.version = 0
 		#: Indicates that the last load or update contained an error.
 		#: @type: bool
 		self.lastUpdateContainedError = False
@@ -199,6 +202,7 @@ class GlobalGestureMap(object):
 		"""Clear this map.
 		"""
 		self._map.clear()
+		self.version += 1
 		self.lastUpdateContainedError = False
 
 	def add(self, gesture, module, className, script,replace=False):
@@ -223,6 +227,7 @@ class GlobalGestureMap(object):
 		if replace:
 			del scripts[:]
 		scripts.append((module, className, script))
+		self.version += 1
 
 	def load(self, filename):
 		"""Load map entries from a file.
@@ -340,6 +345,7 @@ class GlobalGestureMap(object):
 		except KeyError:
 			raise ValueError("Mapping not found")
 		scripts.remove((module, className, script))
+		self.version += 1
 
 	def save(self):
 		"""Save this gesture map to disk.
@@ -396,6 +402,12 @@ class InputManager(baseObject.AutoPropertyObject):
 		#: The gestures mapped by the user.
 		#: @type: L{GlobalGestureMap}
 		self.userGestureMap = GlobalGestureMap()
+		#: Caches the scripts from global gesture maps for gestures; see L{getGlobalMapScripts}.
+		#: @type: dict
+		self._globalMapScriptsIndex = {}
+		#: The global gesture maps and their versions when L{_globalMapScriptsIndex} was built.
+		#: @type: tuple
+		self._globalMapScriptsIndexKey = None
 		self.loadLocaleGestureMap()
 		self.loadUserGestureMap()
 
@@ -465,6 +477,51 @@ class InputManager(baseObject.AutoPropertyObject):
 
 		raise NoInputGestureAction
 
+	def getGlobalMapScripts(self, identifiers, globalMaps):
+		"""Get the scripts bound to a gesture in global gesture maps.
+		The result is indexed by identifiers,
+		so repeated gestures don't need to look up each map and resolve each class again.
+		The index is discarded when any of the maps changes or different maps are passed.
+		@param identifiers: The normalized identifiers of the gesture.
+		@type identifiers: list of str
+		@param globalMaps: The global gesture maps to search in order.
+		@type globalMaps: list of L{GlobalGestureMap}
+		@return: The Python class and script name for each script, as for L{GlobalGestureMap.getScriptsForGesture},
+			for each map and then each identifier.
+		@rtype: tuple of (class, str)
+		"""
+		key = tuple((globalMap, globalMap.version) for globalMap in globalMaps)
+		if key != self._globalMapScriptsIndexKey:
+			self._globalMapScriptsIndex.clear()
+			self._globalMapScriptsIndexKey = key
+		identifiers = tuple(identifiers)
+		try:
+			return self._globalMapScriptsIndex[identifiers]
+		except KeyError:
+			pass
+		scripts = []
+		# Whether the classes for all entries could be found.
+		# If not, the module might be imported later, so the result can't be indexed.
+		complete = True
+		for globalMap in globalMaps:
+			for identifier in identifiers:
+				found = list(globalMap.getScriptsForGesture(identifier))
+				if len(found) < len(globalMap._map.get(identifier, ())):
+					complete = False
+				scripts.extend(found)
+		scripts = tuple(scripts)
+		if complete:
+			self._globalMapScriptsIndex[identifiers] = scripts
+		return scripts
+
+	def invalidateGlobalMapScriptsIndex(self):
+		"""Discard the index built by L{getGlobalMapScripts}.
+		This must be called when modules containing scripts are reloaded,
+		as the index refers to the classes in the old modules.
+		"""
+		self._globalMapScriptsIndex.clear()
+		self._globalMapScriptsIndexKey = None
+
 	def _get_isInputHelpActive(self):
 		"""Whether input help is enabled, wherein the function of each key pressed by the user is reported but not executed.
 		@rtype: bool
@@ -0,0 +1,297 @@
+#ioExecutor.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Executors which run braille display I/O on a single background thread.
+L{braille._BgThread} uses an executor for background writes and raw I/O (see L{hwIo}).
+L{ApcExecutor} uses Windows asynchronous procedure calls and is required by L{hwIo},
+as overlapped reads complete via APCs.
+L{QueueExecutor} is pure Python and can be used with L{LoopbackIo} to drive display protocol code
+over an in-memory transport, including on other platforms.
+"""
+
+import threading
+import time
+import Queue
+from logHandler import log
+
+class Executor(object):
+	"""Runs functions on a single background thread.
+	Functions are run in the order they were queued.
+	"""
+
+	def start(self):
+		"""Start the thread.
+		"""
+		raise NotImplementedError
+
+	def stop(self):
+		"""Stop the thread, waiting for it to exit.
+		Functions queued but not yet run may be discarded.
+		"""
+		raise NotImplementedError
+
+	def queue(self, func, param=0):
+		"""Queue a function to be run on the thread.
+		@param func: The function to run.
+			For L{ApcExecutor}, this must be a C{winKernel.PAPCFUNC}.
+		@type func: callable(int)
+		@param param: The argument passed to C{func}.
+		@type param: int
+		"""
+		raise NotImplementedError
+
+class ApcExecutor(Executor):
+	"""Runs functions on a thread which waits in an alertable state using Windows asynchronous procedure calls.
+	Overlapped I/O completion routines (e.g. those used by L{hwIo}) also run on this thread.
+	"""
+
+	def __init__(self):
+		self._thread = None
+		self._handle = None
+		self._exit = False
+
+	def start(self):
+		# Windows specific modules are imported here so that this module can be imported on other platforms.
+		import ctypes
+		import winKernel
+		self._exit = False
+		# Used to wake the thread so that it notices it should exit.
+		self._wake = winKernel.PAPCFUNC(lambda param: None)
+		thread = self._thread = threading.Thread(target=self._func)
+		thread.daemon = True
+		thread.start()
+		self._handle = ctypes.windll.kernel32.OpenThread(winKernel.THREAD_SET_CONTEXT, False, thread.ident)
+
+	def queue(self, func, param=0):
+		import ctypes
+		ctypes.windll.kernel32.QueueUserAPC(func, self._handle, param)
+
+	def stop(self):
+		import winKernel
+		self._exit = True
+		self.queue(self._wake)
+		self._thread.join()
+		winKernel.closeHandle(self._handle)
+		self._handle = None
+		self._thread = None
+
+	def _func(self):
+		import ctypes
+		import winKernel
+		while True:
+			ctypes.windll.kernel32.SleepEx(winKernel.INFINITE, True)
+			if self._exit:
+				break
+
+class QueueExecutor(Executor):
+	"""Runs functions on a thread which takes them from a queue.
+	This doesn't depend on any platform specific functionality.
+	"""
+
+	def __init__(self):
+		self._thread = None
+		self._queue = Queue.Queue()
+
+	def start(self):
+		thread = self._thread = threading.Thread(target=self._func)
+		thread.daemon = True
+		thread.start()
+
+	def queue(self, func, param=0):
+		self._queue.put((func, param))
+
+	def stop(self):
+		# None tells the thread to exit.
+		self._queue.put(None)
+		self._thread.join()
+		self._thread = None
+
+	def _func(self):
+		while True:
+			item = self._queue.get()
+			if item is None:
+				break
+			func, param = item
+			try:
+				func(param)
+			except:
+				log.error("Error in function queued to I/O thread", exc_info=True)
+
+class LoopbackTransport(object):
+	"""An in-memory, bidirectional byte stream between two endpoints.
+	Data written to one endpoint can be read from the other; see L{LoopbackEndpoint}.
+	Typically, a driver talks to one endpoint through L{LoopbackIo}
+	and the other endpoint simulates the device.
+	"""
+
+	def __init__(self):
+		aToB = _LoopbackBuffer()
+		bToA = _LoopbackBuffer()
+		#: The first endpoint.
+		#: @type: L{LoopbackEndpoint}
+		self.a = LoopbackEndpoint(bToA, aToB)
+		#: The second endpoint.
+		#: @type: L{LoopbackEndpoint}
+		self.b = LoopbackEndpoint(aToB, bToA)
+
+	def close(self):
+		"""Close both directions, waking any blocked reads.
+		"""
+		self.a.close()
+		self.b.close()
+
+class _LoopbackBuffer(object):
+	"""Bytes travelling in one direction of a L{LoopbackTransport}.
+	"""
+
+	def __init__(self):
+		self._data = bytearray()
+		self._cond = threading.Condition()
+		self.closed = False
+		#: The total number of bytes written.
+		self.bytesWritten = 0
+
+	def write(self, data):
+		with self._cond:
+			self._data.extend(data)
+			self.bytesWritten += len(data)
+			self._cond.notify_all()
+
+	def read(self, size, timeout=None):
+		"""Read exactly C{size} bytes unless the timeout elapses or the buffer is closed,
+		in which case fewer bytes may be returned.
+		"""
+		if timeout is not None:
+			deadline = time.time() + timeout
+		with self._cond:
+			while len(self._data) < size and not self.closed:
+				if timeout is None:
+					self._cond.wait()
+					continue
+				remaining = deadline - time.time()
+				if remaining <= 0:
+					break
+				self._cond.wait(remaining)
+			data = str(self._data[:size])
+			del self._data[:size]
+			return data
+
+	def close(self):
+		with self._cond:
+			self.closed = True
+			self._cond.notify_all()
+
+class LoopbackEndpoint(object):
+	"""One end of a L{LoopbackTransport}.
+	"""
+
+	def __init__(self, readBuf, writeBuf):
+		self._readBuf = readBuf
+		self._writeBuf = writeBuf
+
+	def read(self, size=1, timeout=None):
+		"""Read data sent from the other endpoint.
+		@param size: The number of bytes to read.
+		@type size: int
+		@param timeout: The maximum time to wait in seconds, C{None} to wait until the data arrives.
+		@type timeout: float
+		@return: The data, which is shorter than C{size} if the timeout elapsed or the transport was closed.
+		@rtype: str
+		"""
+		return self._readBuf.read(size, timeout)
+
+	def write(self, data):
+		"""Send data to the other endpoint.
+		@type data: str
+		"""
+		self._writeBuf.write(data)
+
+	@property
+	def bytesWritten(self):
+		"""The total number of bytes written by this endpoint.
+		@rtype: int
+		"""
+		return self._writeBuf.bytesWritten
+
+	def close(self):
+		self._readBuf.close()
+		self._writeBuf.close()
+
+class LoopbackIo(object):
+	"""Raw I/O over a L{LoopbackEndpoint}, with the same interface as L{hwIo.Serial}.
+	Overlapped reads are emulated by a reader thread which waits for each chunk of data
+	and then runs the receive callback on the executor's thread, just as an overlapped read completes there.
+	The next chunk isn't read until the callback returns,
+	so the callback can synchronously L{read} additional bytes.
+	"""
+
+	def __init__(self, endpoint, onReceive, executor, onReceiveSize=1, timeout=1):
+		"""Constructor.
+		@param endpoint: The endpoint to use.
+		@type endpoint: L{LoopbackEndpoint}
+		@param onReceive: A callable taking the received data as its only argument.
+		@type onReceive: callable(str)
+		@param executor: The executor on which C{onReceive} is called.
+		@type executor: L{Executor}
+		@param onReceiveSize: The size (in bytes) of the data with which to call C{onReceive}.
+		@type onReceiveSize: int
+		@param timeout: The timeout in seconds for synchronous reads.
+		@type timeout: float
+		"""
+		self._endpoint = endpoint
+		self._onReceive = onReceive
+		self._executor = executor
+		self._readSize = onReceiveSize
+		self.timeout = timeout
+		self._recvEvt = threading.Event()
+		self._notifyDone = threading.Event()
+		self._reader = threading.Thread(target=self._readLoop)
+		self._reader.daemon = True
+		self._reader.start()
+
+	def waitForRead(self, timeout):
+		"""Wait for a chunk of data to be received and processed.
+		@param timeout: The maximum time to wait in seconds.
+		@type timeout: int or float
+		@return: C{True} if received data was processed before the timeout,
+			C{False} if not.
+		@rtype: bool
+		"""
+		if not self._recvEvt.wait(timeout):
+			return False
+		self._recvEvt.clear()
+		return True
+
+	def read(self, size=1):
+		return self._endpoint.read(size, self.timeout)
+
+	def write(self, data):
+		self._endpoint.write(data)
+
+	def close(self):
+		self._onReceive = None
+		self._endpoint.close()
+
+	def _readLoop(self):
+		while True:
+			data = self._endpoint.read(self._readSize)
+			if len(data) < self._readSize or not self._onReceive:
+				# The endpoint has been closed.
+				return
+			self._notifyDone.clear()
+			self._executor.queue(lambda param, data=data: self._ioDone(data))
+			self._notifyDone.wait()
+
+	def _ioDone(self, data):
+		try:
+			if self._onReceive:
+				try:
+					self._onReceive(data)
+				except:
+					log.error("", exc_info=True)
+				self._recvEvt.set()
+		finally:
+			self._notifyDone.set()
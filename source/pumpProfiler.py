@@ -0,0 +1,210 @@
+#pumpProfiler.py
+#A part of NonVisual Desktop Access (NVDA)
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+#Copyright (C) 2017 NV Access Limited
+
+"""Low overhead instrumentation of NVDA's core pump, to help find out why NVDA is sluggish.
+When enabled, every L{sampleInterval}th core pump cycle is sampled.
+For sampled cycles, this records:
+	- The time taken by each stage of the pump (touch, JAB, IAccessible, queue, mouse, braille, cache invalidation),
+		kept for the most recent L{RING_SIZE} sampled cycles.
+	- The time taken to execute each event type and each script.
+		This excludes the time taken by events and scripts executed within it
+		(e.g. the focusEntered events executed for a gainFocus event), so nothing is counted twice.
+	- The number of property cache hits and misses in L{baseObject.AutoPropertyObject}.
+Nothing is recorded for cycles which aren't sampled, which keeps the overhead low.
+For example, from the NVDA Python console::
+	import pumpProfiler
+	pumpProfiler.enable()
+	# Use NVDA for a while...
+	print pumpProfiler.getReport()
+	pumpProfiler.dump(r"c:\\temp\\pumpProfile.txt")
+"""
+
+import collections
+import time
+from timeit import default_timer as timer
+from logHandler import log
+import baseObject
+
+#: The number of sampled pump cycles to keep.
+RING_SIZE = 200
+
+#: Whether profiling is enabled.
+isEnabled = False
+#: Sample one in every this many core pump cycles.
+sampleInterval = 10
+#: The most recent sampled pump cycles,
+#: each a tuple of (start time, total duration, ((stage, duration), ...)).
+#: Times are in seconds.
+cycles = collections.deque(maxlen=RING_SIZE)
+#: Maps event names to [count, total duration, maximum duration] for sampled cycles.
+eventTimes = {}
+#: Maps script names to [count, total duration, maximum duration] for sampled cycles.
+scriptTimes = {}
+
+_cycleCount = 0
+#: The stages recorded so far in the current cycle, C{None} if this cycle isn't being sampled.
+_stages = None
+_cycleStart = 0
+_lastMark = 0
+#: For each event or script currently being timed, outermost first,
+#: the total time taken by the events and scripts executed within it.
+_nestedDurations = []
+
+def enable(interval=None):
+	"""Start profiling.
+	@param interval: If specified, sample one in every this many core pump cycles; see L{sampleInterval}.
+	@type interval: int
+	"""
+	global isEnabled, sampleInterval
+	if interval:
+		sampleInterval = interval
+	isEnabled = True
+
+def disable():
+	"""Stop profiling.
+	Data already recorded is kept until L{reset} is called.
+	"""
+	global isEnabled, _stages
+	isEnabled = False
+	if _stages is not None:
+		_stages = None
+		baseObject.AutoPropertyObject.setPropertyCacheCounting(False)
+
+def reset():
+	"""Discard all recorded data.
+	"""
+	cycles.clear()
+	eventTimes.clear()
+	scriptTimes.clear()
+	baseObject.AutoPropertyObject.propertyCacheHits = 0
+	baseObject.AutoPropertyObject.propertyCacheMisses = 0
+
+def startCycle():
+	"""Called by the core at the start of each pump cycle.
+	"""
+	global _cycleCount, _stages, _cycleStart, _lastMark
+	if not isEnabled:
+		return
+	_cycleCount += 1
+	if _cycleCount % sampleInterval:
+		return
+	_stages = []
+	del _nestedDurations[:]
+	baseObject.AutoPropertyObject.setPropertyCacheCounting(True)
+	_cycleStart = _lastMark = timer()
+
+def mark(stage):
+	"""Called by the core when a stage of the pump cycle completes.
+	@param stage: The name of the stage.
+	@type stage: str
+	"""
+	global _lastMark
+	if _stages is None:
+		return
+	now = timer()
+	_stages.append((stage, now - _lastMark))
+	_lastMark = now
+
+def endCycle():
+	"""Called by the core at the end of each pump cycle.
+	"""
+	global _stages
+	if _stages is None:
+		return
+	baseObject.AutoPropertyObject.setPropertyCacheCounting(False)
+	cycles.append((time.time(), timer() - _cycleStart, tuple(_stages)))
+	_stages = None
+
+def startTiming():
+	"""Start timing an event or script.
+	@return: The start time to pass to L{recordEvent} or L{recordScript},
+		C{None} if this cycle isn't being sampled.
+	@rtype: float
+	"""
+	if _stages is None:
+		return None
+	_nestedDurations.append(0)
+	return timer()
+
+def _record(times, name, startTime):
+	duration = timer() - startTime
+	nested = _nestedDurations.pop() if _nestedDurations else 0
+	if _nestedDurations:
+		_nestedDurations[-1] += duration
+	duration -= nested
+	entry = times.get(name)
+	if not entry:
+		times[name] = [1, duration, duration]
+		return
+	entry[0] += 1
+	entry[1] += duration
+	if duration > entry[2]:
+		entry[2] = duration
+
+def recordEvent(eventName, startTime):
+	"""Record the execution time of an event.
+	@param startTime: The value returned by L{startTiming}. If C{None}, nothing is recorded.
+	"""
+	if startTime is not None:
+		_record(eventTimes, eventName, startTime)
+
+def recordScript(script, startTime):
+	"""Record the execution time of a script.
+	@param startTime: The value returned by L{startTiming}. If C{None}, nothing is recorded.
+	"""
+	if startTime is None:
+		return
+	owner = getattr(script, "__self__", None)
+	if owner is not None:
+		name = "%s.%s.%s" % (owner.__class__.__module__, owner.__class__.__name__, script.__name__)
+	else:
+		name = getattr(script, "__name__", repr(script))
+	_record(scriptTimes, name, startTime)
+
+def _formatTimes(times):
+	lines = []
+	for name, (count, total, maximum) in sorted(times.iteritems(), key=lambda item: item[1][1], reverse=True):
+		lines.append("%s: count %d, total %.1f ms, average %.3f ms, max %.3f ms"
+			% (name, count, total * 1000, total * 1000 / count, maximum * 1000))
+	return lines
+
+def getReport():
+	"""Get a textual report of the recorded data.
+	@rtype: str
+	"""
+	lines = ["Sampled pump cycles: %d (1 in %d)" % (len(cycles), sampleInterval)]
+	if cycles:
+		stageTotals = collections.OrderedDict()
+		stageMaxima = {}
+		for start, total, stages in cycles:
+			for stage, duration in stages:
+				stageTotals[stage] = stageTotals.get(stage, 0) + duration
+				stageMaxima[stage] = max(stageMaxima.get(stage, 0), duration)
+		lines.append("Average cycle %.3f ms, max %.3f ms"
+			% (sum(cycle[1] for cycle in cycles) * 1000 / len(cycles), max(cycle[1] for cycle in cycles) * 1000))
+		for stage, total in stageTotals.iteritems():
+			lines.append("  %s: average %.3f ms, max %.3f ms"
+				% (stage, total * 1000 / len(cycles), stageMaxima[stage] * 1000))
+	hits = baseObject.AutoPropertyObject.propertyCacheHits
+	misses = baseObject.AutoPropertyObject.propertyCacheMisses
+	lines.append("Property cache: %d hits, %d misses" % (hits, misses))
+	lines.append("Events:")
+	lines.extend("  " + line for line in _formatTimes(eventTimes))
+	lines.append("Scripts:")
+	lines.extend("  " + line for line in _formatTimes(scriptTimes))
+	return "\n".join(lines)
+
+def dump(fileName=None):
+	"""Write a report of the recorded data to a file or the log.
+	@param fileName: The file to write to, C{None} to write to the log.
+	@type fileName: basestring
+	"""
+	report = getReport()
+	if not fileName:
+		log.info("Pump profile:\n%s" % report)
+		return
+	with open(fileName, "w") as f:
+		f.write(report)
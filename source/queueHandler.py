@@ -5,14 +5,112 @@
 #See the file COPYING for more details.
 
 import types
-from Queue import Queue
+import time
+from collections import deque
+from Queue import Empty, Full
 import globalVars
 from logHandler import log
 import watchdog
 import core
+import config
 
-eventQueue=Queue()
-eventQueue.__name__="eventQueue"
+#: Priority for functions which should run before any others queued;
+#: see L{queuePriorityFunction}.
+PRIORITY_HIGH=0
+#: Priority for most queued functions.
+PRIORITY_NORMAL=1
+
+#: The minimum time in seconds between notifications to the watchdog while flushing a queue.
+WATCHDOG_ALIVE_INTERVAL=0.01
+
+class FunctionQueue(object):
+	"""A queue of functions to be run in the main thread.
+	This has the same C{put_nowait}, C{get_nowait}, C{empty} and C{qsize} methods as C{Queue.Queue},
+	but it is backed by deques, which can be appended to and popped from in any thread without taking a lock.
+	There is a separate lane for each priority; functions with a higher priority are run first,
+	and functions with the same priority are run in the order they were queued.
+	Metrics about the queue depth and the time functions spend waiting are also kept.
+	"""
+
+	def __init__(self,name,maxsize=0):
+		"""Constructor.
+		@param name: The name of the queue, used when logging errors.
+		@type name: str
+		@param maxsize: The maximum number of items which can be queued, 0 for no limit.
+		@type maxsize: int
+		"""
+		self.__name__=name
+		self.maxsize=maxsize
+		# One deque per priority, indexed by priority.
+		self._lanes=(deque(),deque())
+		self.resetMetrics()
+
+	def resetMetrics(self):
+		"""Reset the metrics kept for this queue.
+		"""
+		#: The maximum number of items which have been queued at once.
+		self.maxDepth=0
+		#: The number of items which have been taken from the queue.
+		self.processedCount=0
+		#: The total time in seconds items spent in the queue.
+		self.totalWaitTime=0.0
+		#: The maximum time in seconds an item spent in the queue.
+		self.maxWaitTime=0.0
+
+	def put_nowait(self,item,priority=PRIORITY_NORMAL):
+		"""Queue an item.
+		@param item: The item, usually a tuple of (func,args,kwargs).
+		@param priority: One of the C{PRIORITY_*} constants.
+		@type priority: int
+		@raise Queue.Full: If the queue has reached its maximum size.
+		"""
+		depth=self.qsize()
+		if self.maxsize and depth>=self.maxsize:
+			raise Full
+		self._lanes[priority].append((item,time.time()))
+		if depth>=self.maxDepth:
+			self.maxDepth=depth+1
+
+	def get_nowait(self):
+		"""Take the next item from the queue.
+		@raise Queue.Empty: If the queue is empty.
+		"""
+		for lane in self._lanes:
+			try:
+				item,queuedTime=lane.popleft()
+			except IndexError:
+				continue
+			waitTime=time.time()-queuedTime
+			self.processedCount+=1
+			self.totalWaitTime+=waitTime
+			if waitTime>self.maxWaitTime:
+				self.maxWaitTime=waitTime
+			return item
+		raise Empty
+
+	def empty(self):
+		for lane in self._lanes:
+			if lane:
+				return False
+		return True
+
+	def qsize(self):
+		return sum(len(lane) for lane in self._lanes)
+
+	def getMetrics(self):
+		"""Get the metrics for this queue.
+		@return: The current depth, maximum depth, number of items processed and average and maximum wait times in seconds.
+		@rtype: dict
+		"""
+		return {
+			"depth":self.qsize(),
+			"maxDepth":self.maxDepth,
+			"processedCount":self.processedCount,
+			"averageWaitTime":self.totalWaitTime/self.processedCount if self.processedCount else 0.0,
+			"maxWaitTime":self.maxWaitTime,
+		}
+
+eventQueue=FunctionQueue("eventQueue")
 generators={}
 lastGeneratorObjID=0
 
@@ -37,19 +135,52 @@ def queueFunction(queue,func,*args,**kwargs):
 	queue.put_nowait((func,args,kwargs))
 	core.requestPump()
 
+def queuePriorityFunction(queue,func,*args,**kwargs):
+	"""Queue a function to be run before any queued with L{queueFunction}.
+	This must only be used for functions which don't depend on the functions queued before them having run.
+	Events, scripts and anything which affects speech (including cancelling or pausing it) must never be queued with this,
+	as the speech of events queued earlier would then be spoken after it.
+	@param queue: The queue, which must be a L{FunctionQueue}.
+	@type queue: L{FunctionQueue}
+	"""
+	queue.put_nowait((func,args,kwargs),priority=PRIORITY_HIGH)
+	core.requestPump()
+
 def isRunningGenerators():
 	res=len(generators)>0
 	log.debug("generators running: %s"%res)
 
-def flushQueue(queue):
-	for count in xrange(queue.qsize()+1):
-		if not queue.empty():
+def flushQueue(queue,timeBudget=None):
+	"""Run the functions in a queue.
+	Functions queued while this runs are left for the next call.
+	@param queue: The queue.
+	@param timeBudget: If specified, stop once this many seconds have been spent
+		and request another core pump to run the rest,
+		so that a burst of queued functions can't stop the core from processing other things.
+	@type timeBudget: float
+	"""
+	if timeBudget:
+		deadline=time.time()+timeBudget
+	lastAliveTime=0
+	for count in xrange(queue.qsize()):
+		try:
 			(func,args,kwargs)=queue.get_nowait()
+		except Empty:
+			break
+		# Notifying the watchdog is relatively expensive, so don't do it for every function.
+		now=time.time()
+		if now-lastAliveTime>=WATCHDOG_ALIVE_INTERVAL:
 			watchdog.alive()
-			try:
-				func(*args,**kwargs)
-			except:
-				log.exception("Error in func %s from %s"%(func.__name__,queue.__name__))
+			lastAliveTime=now
+		try:
+			func(*args,**kwargs)
+		except:
+			log.exception("Error in func %s from %s"%(func.__name__,queue.__name__))
+		if timeBudget and time.time()>=deadline:
+			if not queue.empty():
+				log.debug("Time budget exhausted with %d items remaining in %s"%(queue.qsize(),queue.__name__))
+				core.requestPump()
+			break
 
 def isPendingItems(queue):
 	if not queue.empty():
@@ -80,4 +211,4 @@ def pumpAll():
 		del gen
 	if generators:
 		core.requestPump()
-	flushQueue(eventQueue)
+	flushQueue(eventQueue,timeBudget=config.conf["general"]["queueTimeBudget"]/1000.0)
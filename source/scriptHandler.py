@@ -18,6 +18,7 @@ import inputCore
 import globalPluginHandler
 import braille
 import keyLabels
+import pumpProfiler
 
 _numScriptsQueued=0 #Number of scripts that are queued to be executed
 #: Number of scripts that send their gestures on that are queued to be executed or are currently being executed.
@@ -67,14 +68,11 @@ def findScript(gesture):
 	# and it might be needed by global maps.
 	import globalCommands
 
-	globalMapScripts = []
 	globalMaps = [inputCore.manager.userGestureMap, inputCore.manager.localeGestureMap]
 	globalMap = braille.handler.display.gestureMap
 	if globalMap:
 		globalMaps.append(globalMap)
-	for globalMap in globalMaps:
-		for identifier in gesture.normalizedIdentifiers:
-			globalMapScripts.extend(globalMap.getScriptsForGesture(identifier))
+	globalMapScripts = inputCore.manager.getGlobalMapScripts(gesture.normalizedIdentifiers, globalMaps)
 
 	# Gesture specific scriptable object.
 	obj = gesture.scriptableObject
@@ -175,6 +173,7 @@ def executeScript(script,gesture):
 	resumeSayAllMode=None
 	if willSayAllResume(gesture):
 		resumeSayAllMode=sayAllHandler.lastSayAllMode
+	startTime=pumpProfiler.startTiming()
 	try:
 		scriptTime=time.time()
 		scriptRef=weakref.ref(scriptFunc)
@@ -188,6 +187,7 @@ def executeScript(script,gesture):
 	except:
 		log.exception("error executing script: %s with gesture %r"%(script,gesture.displayName))
 	finally:
+		pumpProfiler.recordScript(script,startTime)
 		_isScriptRunning=False
 		if resumeSayAllMode is not None:
 			sayAllHandler.readText(resumeSayAllMode)
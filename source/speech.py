@@ -45,6 +45,10 @@ LANGS_WITH_CONJUNCT_CHARS = {'hi', 'as', 'bn', 'gu', 'kn', 'kok', 'ml', 'mni', '
 # for languages such as French and German which use space as a thousands separator.
 CHUNK_SEPARATOR = "  "
 
+#: Languages seen in L{LangChangeCommand}s since they were last prewarmed;
+#: see L{prewarmSeenLanguages}.
+_seenLanguages=set()
+
 oldTreeLevel=None
 oldTableID=None
 oldRowNumber=None
@@ -475,10 +479,11 @@ def speak(speechSequence,symbolLevel=None):
 	if isPaused:
 		cancelSpeech()
 	beenCanceled=False
+	speechConf=config.conf.getSnapshot().speech
 	#Filter out redundant LangChangeCommand objects 
 	#And also fill in default values
-	autoLanguageSwitching=config.conf['speech']['autoLanguageSwitching']
-	autoDialectSwitching=config.conf['speech']['autoDialectSwitching']
+	autoLanguageSwitching=speechConf.autoLanguageSwitching
+	autoDialectSwitching=speechConf.autoDialectSwitching
 	curLanguage=defaultLanguage=getCurrentLanguage()
 	prevLanguage=None
 	defaultLanguageRoot=defaultLanguage.split('_')[0]
@@ -490,6 +495,8 @@ def speak(speechSequence,symbolLevel=None):
 			curLanguage=item.lang
 			if not curLanguage or (not autoDialectSwitching and curLanguage.split('_')[0]==defaultLanguageRoot):
 				curLanguage=defaultLanguage
+			else:
+				_seenLanguages.add(curLanguage)
 		elif isinstance(item,basestring):
 			if not item: continue
 			if autoLanguageSwitching and curLanguage!=prevLanguage:
@@ -504,7 +511,7 @@ def speak(speechSequence,symbolLevel=None):
 		return
 	log.io("Speaking %r" % speechSequence)
 	if symbolLevel is None:
-		symbolLevel=config.conf["speech"]["symbolLevel"]
+		symbolLevel=speechConf.symbolLevel
 	curLanguage=defaultLanguage
 	inCharacterMode=False
 	for index in xrange(len(speechSequence)):
@@ -519,6 +526,18 @@ def speak(speechSequence,symbolLevel=None):
 				speechSequence[index]+=CHUNK_SEPARATOR
 	getSynth().speak(speechSequence)
 
+def prewarmSeenLanguages():
+	"""Prepare speech symbol processing in the background for languages seen in recent L{LangChangeCommand}s,
+	so that speaking text in those languages later (e.g. further on in a multilingual document) doesn't have to wait for it.
+	This is called by the core once its queue is empty, so that it doesn't compete with speech which is being processed.
+	"""
+	global _seenLanguages
+	if not _seenLanguages:
+		return
+	languages=_seenLanguages
+	_seenLanguages=set()
+	characterProcessing.prewarmSpeechSymbolProcessors(languages)
+
 def speakSelectionMessage(message,text):
 	if len(text) < 512:
 		speakMessage(message % text)
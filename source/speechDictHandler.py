@@ -11,6 +11,7 @@ import os
 import codecs
 import api
 import config
+import textUtils
 
 dictionaries = {}
 dictTypes = ("temp", "voice", "default", "builtin") # ordered by their priority E.G. voice specific speech dictionary is processed before the default
@@ -46,6 +47,35 @@ class SpeechDictEntry:
 
 class SpeechDict(list):
 
+	#: The entries this dictionary's compiled form was last built from.
+	_compiledEntries = None
+	#: The compiled form of this dictionary; see L{_getCompiled}.
+	_compiled = ()
+
+	def _getCompiled(self):
+		"""Get the compiled form of this dictionary, rebuilding it if the entries have changed since it was last built.
+		The compiled form is a tuple of (needle, caseSensitive, entry) in priority order.
+		For entries which match literal text (anywhere or whole word), needle is the text which must be present for the entry to match at all,
+		case folded if the entry is not case sensitive.
+		For regular expression entries, needle is C{None}.
+		@rtype: tuple
+		"""
+		entries = tuple(self)
+		if entries == self._compiledEntries:
+			return self._compiled
+		compiled = []
+		for entry in entries:
+			if entry.type == ENTRY_TYPE_REGEXP:
+				needle = None
+			elif entry.caseSensitive:
+				needle = entry.pattern
+			else:
+				needle = textUtils.foldCase(entry.pattern)
+			compiled.append((needle, entry.caseSensitive, entry))
+		self._compiled = tuple(compiled)
+		self._compiledEntries = entries
+		return self._compiled
+
 	def load(self, fileName):
 		self.fileName=fileName
 		comment=""
@@ -97,8 +127,28 @@ class SpeechDict(list):
 		file.close()
 
 	def sub(self, text):
-		for entry in self:
-			text = entry.sub(text)
+		if not isinstance(text, unicode):
+			for entry in self:
+				text = entry.sub(text)
+			return text
+		# Entries are applied in order, each to the output of the previous one.
+		# Checking for a literal entry's text with a plain substring search is much cheaper than running its regular expression,
+		# and most entries don't match most utterances, so the regular expression is only run if the entry could possibly match.
+		foldedText = None
+		for needle, caseSensitive, entry in self._getCompiled():
+			if needle is not None:
+				if caseSensitive:
+					if needle not in text:
+						continue
+				else:
+					if foldedText is None:
+						foldedText = textUtils.foldCase(text)
+					if needle not in foldedText:
+						continue
+			newText = entry.sub(text)
+			if newText != text:
+				text = newText
+				foldedText = None
 		return text
 
 def processText(text):
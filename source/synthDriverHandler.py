@@ -33,6 +33,16 @@ def changeVoice(synth, voice):
 	if globalVars.settingsRing: globalVars.settingsRing.updateSupportedSettings(synth)
 	else:  globalVars.settingsRing = SynthSettingsRing(synth)
 	speechDictHandler.loadVoiceDict(synth)
+	if synth is _curSynth:
+		_prewarmSpeechSymbolProcessors()
+
+def _prewarmSpeechSymbolProcessors():
+	"""Prepare speech symbol processing for the current voice's language in the background,
+	so that speaking the first text in that language doesn't have to wait for it.
+	"""
+	import speech
+	import characterProcessing
+	characterProcessing.prewarmSpeechSymbolProcessors((speech.getCurrentLanguage(),))
 
 def _getSynthDriver(name):
 	return __import__("synthDrivers.%s" % name, globals(), locals(), ("synthDrivers",)).SynthDriver
@@ -97,6 +107,7 @@ def setSynth(name,isFallback=False):
 			changeVoice(newSynth,voice)
 			newSynth.saveSettings() #save defaults
 		_curSynth=newSynth
+		_prewarmSpeechSymbolProcessors()
 		_audioOutputDevice=config.conf["speech"]["outputDevice"]
 		if not isFallback:
 			config.conf["speech"]["synth"]=name
@@ -4,12 +4,14 @@
 #See the file COPYING for more details.
 #Copyright (C) 2006 Michael Curran <mick@kulgan.net>, James Teh <jamie@jantrid.net>
 
-import re
 import ctypes
 import unicodedata
+import bisect
+import collections
 import NVDAHelper
 import config
 import textInfos
+import textUtils
 
 class Offsets(object):
 	"""Represents two offsets."""
@@ -130,6 +132,244 @@ def findEndOfWord(text,offset,lineLength=None):
 		offset+=1
 	return offset
 
+def _findAll(text,char,start=0,end=None):
+	"""Find the offsets of all occurrences of a character in some text.
+	@rtype: list of int
+	"""
+	if end is None:
+		end=len(text)
+	offsets=[]
+	offset=text.find(char,start,end)
+	while offset>=0:
+		offsets.append(offset)
+		offset=text.find(char,offset+1,end)
+	return offsets
+
+def _commonPrefixLength(a,b,limit):
+	"""Find the length of the common prefix of two strings, considering no more than limit characters.
+	Ever larger slices are compared so that this runs at the speed of string comparison.
+	"""
+	matched=0
+	step=256
+	while matched<limit:
+		end=min(matched+step,limit)
+		if a[matched:end]==b[matched:end]:
+			matched=end
+			step*=2
+			continue
+		# The first difference is in this slice.
+		while end-matched>1:
+			middle=(matched+end)//2
+			if a[matched:middle]==b[matched:middle]:
+				matched=middle
+			else:
+				end=middle
+		break
+	return matched
+
+def _commonSuffixLength(a,b,limit):
+	"""Find the length of the common suffix of two strings, considering no more than limit characters.
+	"""
+	aLen=len(a)
+	bLen=len(b)
+	matched=0
+	step=256
+	while matched<limit:
+		end=min(matched+step,limit)
+		if a[aLen-end:aLen-matched]==b[bLen-end:bLen-matched]:
+			matched=end
+			step*=2
+			continue
+		while end-matched>1:
+			middle=(matched+end)//2
+			if a[aLen-middle:aLen-matched]==b[bLen-middle:bLen-matched]:
+				matched=middle
+			else:
+				end=middle
+		break
+	return matched
+
+class _OffsetList(object):
+	"""A sorted list of offsets which can be cheaply updated for an edit to the text.
+	The offsets are stored in blocks, each with a shift added to all of its offsets,
+	so that moving all offsets after an edit only touches each block once, not each offset.
+	Instances are never modified; L{replace} returns a new list which shares unchanged blocks.
+	"""
+
+	#: The number of offsets in each block.
+	BLOCK_SIZE=512
+
+	def __init__(self,offsets=None):
+		offsets=offsets or []
+		size=self.BLOCK_SIZE
+		self._blocks=[offsets[start:start+size] for start in xrange(0,len(offsets),size)]
+		self._shifts=[0]*len(self._blocks)
+		#: The first offset in each block, including its shift, used to find the block for an offset.
+		self._firsts=[block[0] for block in self._blocks]
+
+	def rfind(self,end):
+		"""Find the last offset before end.
+		@return: The offset or -1 if there is none.
+		"""
+		index=bisect.bisect_left(self._firsts,end)
+		if index==0:
+			return -1
+		block=self._blocks[index-1]
+		shift=self._shifts[index-1]
+		return block[bisect.bisect_left(block,end-shift)-1]+shift
+
+	def find(self,start):
+		"""Find the first offset at or after start.
+		@return: The offset or -1 if there is none.
+		"""
+		index=bisect.bisect_left(self._firsts,start)
+		if index>0:
+			block=self._blocks[index-1]
+			shift=self._shifts[index-1]
+			blockIndex=bisect.bisect_left(block,start-shift)
+			if blockIndex<len(block):
+				return block[blockIndex]+shift
+		if index<len(self._firsts):
+			return self._firsts[index]
+		return -1
+
+	def replace(self,start,end,newOffsets,delta):
+		"""Get a copy of this list updated for an edit to the text.
+		@param start: The start of the replaced text.
+		@param end: The end of the replaced text (before the edit).
+		@param newOffsets: The offsets in the replacement text, relative to the start of the text.
+		@param delta: The difference in length between the replacement text and the replaced text.
+		@rtype: L{_OffsetList}
+		"""
+		firsts=self._firsts
+		# Blocks which might contain offsets in the replaced text must be rebuilt.
+		firstBlock=max(bisect.bisect_right(firsts,start)-1,0)
+		lastBlock=bisect.bisect_left(firsts,end)
+		offsets=[]
+		for blockIndex in xrange(firstBlock,lastBlock):
+			shift=self._shifts[blockIndex]
+			offsets.extend(offset+shift for offset in self._blocks[blockIndex])
+		offsets=[offset for offset in offsets if offset<start]+newOffsets+[offset+delta for offset in offsets if offset>=end]
+		new=_OffsetList(offsets)
+		new._blocks=self._blocks[:firstBlock]+new._blocks+self._blocks[lastBlock:]
+		new._shifts=self._shifts[:firstBlock]+new._shifts+[shift+delta for shift in self._shifts[lastBlock:]]
+		new._firsts=firsts[:firstBlock]+new._firsts+[first+delta for first in firsts[lastBlock:]]
+		return new
+
+class BoundaryIndex(object):
+	"""Indexes the line boundaries in the text of a story so that line offsets can be found without searching the text.
+	The line offsets are exactly those found by L{findStartOfLine} and L{findEndOfLine},
+	but each lookup is a binary search over the offsets of line feeds and carriage returns.
+	Use L{getBoundaryIndex} to get an index for some text, as this reuses a previously built index for the same text
+	and updates the index for small edits rather than building it again.
+	"""
+
+	#: Changes of up to this many characters are always handled by L{update}, even in short text.
+	MIN_UPDATE_SIZE=1024
+
+	def __init__(self,text,lineFeeds=None,carriageReturns=None):
+		"""
+		@param text: The text of the story.
+		@type text: unicode
+		"""
+		self.text=text
+		#: The offsets of all line feed characters.
+		self._lineFeeds=lineFeeds if lineFeeds is not None else _OffsetList(_findAll(text,u"\n"))
+		#: The offsets of all carriage return characters.
+		self._carriageReturns=carriageReturns if carriageReturns is not None else _OffsetList(_findAll(text,u"\r"))
+
+	def update(self,text):
+		"""Get an index for new text, reusing this index for the parts of the text which haven't changed.
+		The changed region is found by comparing the common prefix and suffix of the old and new text,
+		so only lines within that region are indexed again.
+		@param text: The new text of the story.
+		@type text: unicode
+		@return: The new index, or C{None} if too much of the text changed for an update to be worthwhile.
+		@rtype: L{BoundaryIndex}
+		"""
+		oldText=self.text
+		oldLen=len(oldText)
+		newLen=len(text)
+		prefix=_commonPrefixLength(oldText,text,min(oldLen,newLen))
+		suffix=_commonSuffixLength(oldText,text,min(oldLen,newLen)-prefix)
+		newEnd=newLen-suffix
+		if newEnd-prefix>newLen//4+self.MIN_UPDATE_SIZE:
+			return None
+		oldEnd=oldLen-suffix
+		delta=newLen-oldLen
+		return BoundaryIndex(text,
+			lineFeeds=self._lineFeeds.replace(prefix,oldEnd,_findAll(text,u"\n",prefix,newEnd),delta),
+			carriageReturns=self._carriageReturns.replace(prefix,oldEnd,_findAll(text,u"\r",prefix,newEnd),delta))
+
+	def _normalizeOffset(self,offset):
+		# Negative offsets are relative to the end of the text, as for string searches.
+		if offset<0:
+			offset=max(len(self.text)+offset,0)
+		return offset
+
+	def getLineOffsets(self,offset):
+		"""Get the offsets of the line containing the given offset.
+		@param offset: The offset in question.
+		@type offset: int
+		@return: The start and end offsets of the line.
+		@rtype: list of int
+		"""
+		text=self.text
+		if not text:
+			return [0,0]
+		textLen=len(text)
+		if offset>=textLen:
+			offset=textLen-1
+		# See findStartOfLine.
+		start=offset
+		if text[start]=='\n' and start>=0 and text[start-1]=='\r':
+			start-=1
+		start=self._normalizeOffset(start)
+		lineStart=self._lineFeeds.rfind(start)
+		if lineStart<0:
+			lineStart=self._carriageReturns.rfind(start)
+		# See findEndOfLine.
+		end=offset
+		if text[end]!='\n':
+			end=self._lineFeeds.find(self._normalizeOffset(offset))
+		if end<0:
+			if text[offset]!='\r':
+				end=self._carriageReturns.find(self._normalizeOffset(offset))
+		if end<0:
+			end=textLen-1
+		return [lineStart+1,end+1]
+
+#: The maximum number of boundary indexes kept by L{getBoundaryIndex}.
+BOUNDARY_INDEX_CACHE_SIZE=2
+_boundaryIndexCache=collections.OrderedDict()
+
+def getBoundaryIndex(text):
+	"""Get a L{BoundaryIndex} for some text.
+	The most recently used indexes are kept, keyed by their text,
+	so the index is only built once while the text of a story doesn't change.
+	If the text isn't known, but is a small edit of the most recently used text (e.g. after typing a character),
+	the index for that text is updated rather than building a new one.
+	@param text: The text of the story.
+	@type text: unicode
+	@rtype: L{BoundaryIndex}
+	"""
+	try:
+		index=_boundaryIndexCache.pop(text)
+	except KeyError:
+		index=None
+		if _boundaryIndexCache:
+			lastText=next(reversed(_boundaryIndexCache))
+			index=_boundaryIndexCache[lastText].update(text)
+			if index:
+				# The old text has most likely been replaced by this edit.
+				del _boundaryIndexCache[lastText]
+		if not index:
+			index=BoundaryIndex(text)
+		if len(_boundaryIndexCache)>=BOUNDARY_INDEX_CACHE_SIZE:
+			_boundaryIndexCache.popitem(last=False)
+	_boundaryIndexCache[text]=index
+	return index
+
 class OffsetsTextInfo(textInfos.TextInfo):
 	"""An abstract TextInfo for text implementations which represent ranges using numeric offsets relative to the start of the text.
 	In such implementations, the start of the text is represented by 0 and the end is the length of the entire text.
@@ -245,11 +485,14 @@ class OffsetsTextInfo(textInfos.TextInfo):
 		return None
 
 
+	def _getBoundaryIndex(self):
+		"""Get the boundary index for the text of this story.
+		@rtype: L{BoundaryIndex}
+		"""
+		return getBoundaryIndex(self._getStoryText())
+
 	def _getLineOffsets(self,offset):
-		text=self._getStoryText()
-		start=findStartOfLine(text,offset)
-		end=findEndOfLine(text,offset)
-		return [start,end]
+		return self._getBoundaryIndex().getLineOffsets(offset)
 
 	def _getParagraphOffsets(self,offset):
 		return self._getLineOffsets(offset)
@@ -288,8 +531,8 @@ class OffsetsTextInfo(textInfos.TextInfo):
 		if type(position) is type(self):
 			# This is a direct TextInfo to TextInfo copy.
 			# Copy over the contents of the property cache, and any private instance variables (includes the TextInfo's offsets) 
-			self._propertyCache.update(position._propertyCache)
-			self.__dict__.update({x:y for x,y in position.__dict__.iteritems() if x.startswith('_') and x!='_propertyCache'})
+			self._copyPropertyCache(position)
+			self.__dict__.update({x:y for x,y in position.__dict__.iteritems() if x.startswith('_') and x not in ('_propertyCache','_propertyCacheGeneration')})
 		elif position==textInfos.POSITION_FIRST:
 			self._startOffset=self._endOffset=0
 		elif position==textInfos.POSITION_LAST:
@@ -329,6 +572,35 @@ class OffsetsTextInfo(textInfos.TextInfo):
 			raise ValueError("unknown unit: %s"%unit)
 		return offsetsFunc(offset)
 
+	def _usesBaseLineOffsets(self,unit):
+		"""Determine whether the offsets for a unit are calculated by this class from the story text.
+		"""
+		cls=type(self)
+		if (
+			# Subclasses can calculate offsets for any unit themselves in _getUnitOffsets.
+			cls._getUnitOffsets.__func__ is not OffsetsTextInfo._getUnitOffsets.__func__
+			or cls._getLineOffsets.__func__ is not OffsetsTextInfo._getLineOffsets.__func__
+			# The boundary index is built from the story text.
+			or cls._getStoryText.__func__ is OffsetsTextInfo._getStoryText.__func__
+		):
+			return False
+		if unit==textInfos.UNIT_LINE:
+			return True
+		if unit==textInfos.UNIT_PARAGRAPH:
+			return cls._getParagraphOffsets.__func__ is OffsetsTextInfo._getParagraphOffsets.__func__
+		if unit==textInfos.UNIT_READINGCHUNK:
+			return cls._getReadingChunkOffsets.__func__ is OffsetsTextInfo._getReadingChunkOffsets.__func__
+		return False
+
+	def _getUnitOffsetsFunc(self,unit):
+		"""Get a function which retrieves the offsets of a unit at a given offset, suitable for calling repeatedly.
+		Where the offsets of the unit are calculated from the story text,
+		the story text is only fetched once and its boundary index is used for every call.
+		"""
+		if self._usesBaseLineOffsets(unit):
+			return self._getBoundaryIndex().getLineOffsets
+		return lambda offset: self._getUnitOffsets(unit,offset)
+
 	def _get_pointAtStart(self):
 		return self._getPointFromOffset(self._startOffset)
 
@@ -438,6 +710,7 @@ class OffsetsTextInfo(textInfos.TextInfo):
 		count=0
 		lowLimit=0
 		highLimit=self._getStoryLength()
+		getUnitOffsets=self._getUnitOffsetsFunc(unit)
 		if self.allowMoveToOffsetPastEnd and unit==textInfos.UNIT_CHARACTER:
 			# #2096: There is often an uncounted character at the end of the text
 			# where the caret is placed to append text.
@@ -446,7 +719,7 @@ class OffsetsTextInfo(textInfos.TextInfo):
 			lastOffset=offset
 			if direction<0 and offset>lowLimit:
 				offset-=1
-			newStart,newEnd=self._getUnitOffsets(unit,offset)
+			newStart,newEnd=getUnitOffsets(offset)
 			if direction<0:
 				offset=newStart
 			elif direction>0:
@@ -470,25 +743,89 @@ class OffsetsTextInfo(textInfos.TextInfo):
 			self._endOffset=tempOffset
 		return count
 
-	def find(self,text,caseSensitive=False,reverse=False):
+	#: The number of characters of the story fetched at a time when searching for text.
+	#: Searches fetch the story in chunks from the search position so that finding a nearby match doesn't fetch the rest of the story.
+	#: @type: int
+	findChunkSize=65536
+
+	def _iterFindChunks(self,start,end,textLen,reverse=False):
+		"""Fetch the text between two offsets in chunks for searching.
+		Each chunk overlaps the next by textLen-1 characters, so every match lies entirely within at least one chunk.
+		@return: Yields the offset of each chunk and its text.
+		@rtype: generator of (int, unicode)
+		"""
+		chunkSize=self.findChunkSize
 		if reverse:
-			# When searching in reverse, we reverse both strings and do a forwards search.
-			text = text[::-1]
-			# Start searching one before the start to avoid finding the current match.
-			inText=self._getTextRange(0,self._startOffset)[::-1]
+			chunkEnd=end
+			while chunkEnd>start:
+				chunkStart=max(chunkEnd-chunkSize,start)
+				yield chunkStart,self._getTextRange(chunkStart,min(chunkEnd+textLen-1,end))
+				chunkEnd=chunkStart
+		else:
+			chunkStart=start
+			while chunkStart+textLen<=end:
+				yield chunkStart,self._getTextRange(chunkStart,min(chunkStart+chunkSize+textLen-1,end))
+				chunkStart+=chunkSize
+
+	def _findOffset(self,text,start,end,caseSensitive=False,reverse=False):
+		"""Find the offset of the first (or last if reverse is C{True}) occurrence of some text which lies entirely between two offsets.
+		Case insensitive searches compare the case folded text (see L{textUtils.foldCase}),
+		which matches exactly what a case insensitive regular expression would.
+		@return: The offset or C{None} if the text wasn't found.
+		@rtype: int
+		"""
+		if not caseSensitive:
+			text=textUtils.foldCase(text)
+		for chunkStart,chunk in self._iterFindChunks(start,end,len(text),reverse=reverse):
+			if not caseSensitive:
+				chunk=textUtils.foldCase(chunk)
+			offset=chunk.rfind(text) if reverse else chunk.find(text)
+			if offset>=0:
+				return chunkStart+offset
+		return None
+
+	def find(self,text,caseSensitive=False,reverse=False):
+		if not text:
+			# The empty string matches immediately.
+			offset=self._startOffset if reverse else self._startOffset+1
+		elif reverse:
+			# Search before the start to avoid finding the current match.
+			offset=self._findOffset(text,0,self._startOffset,caseSensitive=caseSensitive,reverse=True)
 		else:
 			# Start searching one past the start to avoid finding the current match.
-			inText=self._getTextRange(self._startOffset+1,self._getStoryLength())
-		m=re.search(re.escape(text),inText,(0 if caseSensitive else re.IGNORECASE)|re.UNICODE)
-		if not m:
+			offset=self._findOffset(text,self._startOffset+1,self._getStoryLength(),caseSensitive=caseSensitive)
+		if offset is None:
 			return False
-		if reverse:
-			offset=self._startOffset-m.end()
-		else:
-			offset=self._startOffset+1+m.start()
 		self._startOffset=self._endOffset=offset
 		return True
 
+	def findAll(self,text,caseSensitive=False):
+		"""Find every occurrence of some text in the story.
+		Occurrences may overlap; i.e. these are all the offsets which repeatedly calling L{find} would move to.
+		@param text: The text to search for.
+		@type text: unicode
+		@param caseSensitive: C{True} if the search should be case sensitive.
+		@type caseSensitive: bool
+		@return: The start offsets of the occurrences.
+		@rtype: list of int
+		"""
+		if not text:
+			return []
+		offsets=[]
+		textLen=len(text)
+		if not caseSensitive:
+			text=textUtils.foldCase(text)
+		for chunkStart,chunk in self._iterFindChunks(0,self._getStoryLength(),textLen):
+			if not caseSensitive:
+				chunk=textUtils.foldCase(chunk)
+			# Matches starting in the overlap with the next chunk will be found in that chunk.
+			searchEnd=min(self.findChunkSize,len(chunk))
+			offset=chunk.find(text,0,searchEnd+textLen-1)
+			while 0<=offset<searchEnd:
+				offsets.append(chunkStart+offset)
+				offset=chunk.find(text,offset+1,searchEnd+textLen-1)
+		return offsets
+
 	def updateCaret(self):
 		return self._setCaretOffset(self._startOffset)
 
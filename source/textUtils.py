@@ -0,0 +1,27 @@
+#textUtils.py
+#A part of NonVisual Desktop Access (NVDA)
+#Copyright (C) 2017 NV Access Limited
+#This file is covered by the GNU General Public License.
+#See the file COPYING for more details.
+
+"""Utilities for working with text.
+"""
+
+import sre_compile
+
+#: Translation table which folds characters the regular expression engine treats as equal when ignoring case (e.g. "s" and long s) to a single character.
+_caseEquivalences = {}
+for _chars in getattr(sre_compile, "_equivalences", ()):
+	for _char in _chars:
+		_caseEquivalences[_char] = _chars[0]
+
+def foldCase(text):
+	"""Fold the case of some text so that it can be compared without regard to case.
+	Two strings fold to the same text exactly when a case insensitive unicode regular expression for one matches the other,
+	so a substring search on folded text gives the same result as such a regular expression.
+	Folding never changes the length of the text, so offsets in the folded text are valid in the original.
+	@param text: The text to fold.
+	@type text: unicode
+	@rtype: unicode
+	"""
+	return text.lower().translate(_caseEquivalences)